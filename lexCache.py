@@ -0,0 +1,107 @@
+# lexCache.py jcj 2026-10-18
+
+'''A size-bounded cache of query results which discards those least
+recently used, so that repeated queries need not be worked out again'''
+
+# Standard-library imports
+import sys
+import threading
+from collections import OrderedDict
+from itertools import islice
+
+__all__ = ['LRUCache', 'sizeOf', 'MISSING']
+
+MISSING = object()      # the result of a lookup which finds nothing
+SAMPLE = 100            # items measured in a container, which are taken as
+                        # typical of the rest when it has more than that
+
+def sizeOf(obj):
+    '''Return roughly how many bytes obj takes up, including the strings,
+    lists, tuples, sets and dicts nested within it. Objects shared with
+    others are counted in full, so this errs on the generous side. Only a
+    sample of the items of a large container are measured, so that a long
+    result costs little more to measure than a short one'''
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, dict):
+        return size + sampledSize(obj.items(), len(obj),
+                                  lambda item: sizeOf(item[0]) +
+                                               sizeOf(item[1]))
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return size + sampledSize(obj, len(obj), sizeOf)
+    return size
+
+def sampledSize(items, count, measure):
+    '''Return the sum of measure(item) for the count items, estimated from
+    SAMPLE of them if there are more, spread through a list or tuple and
+    the first of anything else'''
+    if count <= SAMPLE:
+        return sum(map(measure, items))
+    if isinstance(items, (list, tuple)):
+        sample = items[::count // SAMPLE]
+    else:
+        sample = list(islice(items, SAMPLE))
+    return sum(map(measure, sample)) * count // len(sample)
+
+class LRUCache:
+    '''A thread-safe mapping from keys to results taking up no more than
+    maxBytes in all, as measured by sizeOf. Results are shared among all
+    who ask for them, so must not be modified.'''
+
+    def __init__(self, maxBytes):
+        self.maxBytes = maxBytes
+        self.entries = OrderedDict()   # key -> (result, size), oldest first
+        self.size = 0
+        self.hits = self.misses = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, compute):
+        '''Return the result for key, calling compute() to work it out if
+        it is not already cached. compute is called without the lock held,
+        so it may be called twice for the same key by different threads'''
+        result = self.lookup(key, MISSING)
+        if result is MISSING:
+            result = compute()
+            self.put(key, result)
+        return result
+
+    def lookup(self, key, default=None):
+        '''Return the result cached for key, or default if there is none'''
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        return default
+
+    def put(self, key, result):
+        '''Cache result under key, discarding the least recently used
+        results to make room. A result too big for the cache is not kept'''
+        size = sizeOf(key) + sizeOf(result)
+        if size > self.maxBytes:
+            return
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            self.entries[key] = (result, size)
+            self.size += size
+            while self.size > self.maxBytes:
+                _, (_, oldSize) = self.entries.popitem(last=False)
+                self.size -= oldSize
+
+    def clear(self):
+        '''Discard all the cached results, but not the counts of hits and
+        misses'''
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+if __name__ == '__main__':
+    print('This module is intended to be imported rather than run standalone')
@@ -0,0 +1,153 @@
+# lexCompact.py jcj 2026-10-18
+
+'''Compact stand-ins for the lists of strings and the dicts from strings to
+lists of strings which make up the indexes of a Lexicon. They hold their
+strings in one UTF-8 buffer and their lists as runs of integer IDs, so
+millions of entries take a few large objects rather than millions of
+small ones, and are quick to pickle and unpickle. They are read-only and
+decode strings as they are asked for, so lookups are somewhat slower.'''
+
+# Standard-library imports
+from array import array
+from itertools import accumulate, chain
+
+__all__ = ['StringTable', 'CompactMap', 'compactMap']
+
+def offsetArray(limit):
+    '''Return an empty array of unsigned integers big enough to hold limit'''
+    offsets = array('I')
+    if limit >= 1 << (8 * offsets.itemsize):
+        offsets = array('Q')
+    return offsets
+
+class StringTable:
+    '''An immutable sequence of strings, which may not contain newlines,
+    stored in one buffer as UTF-8 lines. Indexing by a slice returns a
+    list. If the strings are sorted, the bisect functions work on it.'''
+
+    def __init__(self, strings=()):
+        strings = list(strings)
+        self.buffer = ('\n'.join(strings) + '\n').encode('utf-8') \
+            if strings else b''
+        # the start of each line, and the end of the last
+        self.offsets = offsetArray(len(self.buffer))
+        self.offsets.extend(accumulate(
+            map(len, self.buffer.split(b'\n')[:-1]),
+            lambda offset, length: offset + length + 1, initial=0))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if type(index) is not int:      # a slice
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            if start >= stop:
+                return []
+            return self.buffer[self.offsets[start]:self.offsets[stop] - 1] \
+                .decode('utf-8').split('\n')
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('StringTable index out of range')
+        return self.buffer[self.offsets[index]:self.offsets[index+1] - 1] \
+            .decode('utf-8')
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def index(self, s):
+        '''Return the position of s in the table, which must be sorted,
+        or -1 if it is not there. UTF-8 sorts in the same order as the
+        strings it encodes, so the search compares bytes without decoding.'''
+        key = s.encode('utf-8')
+        buffer, offsets = self.buffer, self.offsets
+        lo, hi = 0, len(offsets) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if buffer[offsets[mid]:offsets[mid+1] - 1] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(offsets) - 1 and \
+                buffer[offsets[lo]:offsets[lo+1] - 1] == key:
+            return lo
+        return -1
+
+class CompactMap:
+    '''A read-only mapping from strings to lists of strings, in the manner
+    of compressed sparse rows: the sorted keys are a StringTable, and the
+    list for the key at position i is the values whose IDs are
+    ids[starts[i]:starts[i+1]], or simply values[starts[i]:starts[i+1]]
+    if ids is None. Tables of keys or values may be shared between maps.'''
+
+    def __init__(self, keys, starts, ids, values):
+        self.keyTable = keys
+        self.starts = starts
+        self.ids = ids
+        self.valueTable = values
+
+    def row(self, i):
+        '''Return the list for the key at position i'''
+        start, end = self.starts[i], self.starts[i+1]
+        if self.ids is None:
+            return self.valueTable[start:end]
+        values = self.valueTable
+        return [values[j] for j in self.ids[start:end]]
+
+    def get(self, key, default=None):
+        i = self.keyTable.index(key)
+        return self.row(i) if i >= 0 else default
+
+    def __getitem__(self, key):
+        i = self.keyTable.index(key)
+        if i < 0:
+            raise KeyError(key)
+        return self.row(i)
+
+    def extend(self, out, keys):
+        '''Append the list for each of keys in turn to the list out, and
+        return it'''
+        for key in keys:
+            out.extend(self[key])
+        return out
+
+    def __contains__(self, key):
+        return self.keyTable.index(key) >= 0
+
+    def __len__(self):
+        return len(self.keyTable)
+
+    def __iter__(self):
+        return iter(self.keyTable)
+
+    def keys(self):
+        return list(self.keyTable)
+
+    def values(self):
+        return [self.row(i) for i in range(len(self))]
+
+    def items(self):
+        return zip(self.keyTable, self.values())
+
+def compactMap(mapping, keys=None, values=None, valueIds=None):
+    '''Return a CompactMap with the same contents as the dict mapping. keys,
+    if given, is a StringTable of its sorted keys; values, if given, is a
+    StringTable of every value in it, and valueIds the dict from each value
+    to its position there. Without them, new tables are made: the values
+    are then stored in the order of their keys, with no IDs needed.'''
+    if keys is None:
+        keys = StringTable(sorted(mapping))
+    rows = [mapping[key] for key in keys]
+    starts = offsetArray(sum(map(len, rows)))
+    starts.extend(accumulate(map(len, rows), initial=0))
+    if values is None:
+        values = StringTable(chain.from_iterable(rows))
+        return CompactMap(keys, starts, None, values)
+    ids = offsetArray(len(values))
+    ids.extend(map(valueIds.__getitem__, chain.from_iterable(rows)))
+    return CompactMap(keys, starts, ids, values)
+
+if __name__ == '__main__':
+    print('This module is intended to be imported rather than run standalone')
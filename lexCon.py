@@ -1,4 +1,5 @@
-# lexCon.py jcj 2019-07-04, 2020-02-11, 2020-05-11, 2020-05-25, 2020-06-02
+# lexCon.py jcj 2019-07-04, 2020-02-11, 2020-05-11, 2020-05-25, 2020-06-02,
+#              2026-10-18
 
 '''
 Pure command-line and dumb-console interfaces for lexitron
@@ -35,15 +36,17 @@ FN = namedtuple('FUNCTION_INFO',   # info keyed to CS.NAME
                 'NARGS,'    # = CS.NARGS
                 'FUNCT')    # = FUCTIONS[key]
 
-def doCommands(lex, queue):
+def doCommands(lex, queue, output=print, columns=None):
     '''Repeatedly fetch a command from the queue and execute it,
-    until the command is Quit. Prompt for fresh commands as necessary.'''
+    until the command is Quit. Prompt for fresh commands as necessary.
+    Each line of the answers is passed to output; the answers are wrapped
+    to fit columns, or the width of the terminal if that is not given.'''
 
     def getWidth():
         '''Set a variable to the current terminal width adjusted for
         the average width of characters in the current language'''
         nonlocal maxWidth
-        cols, rows = shutil.get_terminal_size()
+        cols = columns or shutil.get_terminal_size()[0]
         maxWidth = cols // languageWidth(languageName(lex.getLanguage()))
     
     def languages():
@@ -78,7 +81,7 @@ def doCommands(lex, queue):
     def stats():
         '''Return information about the available resources'''
         if lex.fileName:
-            nHeads, nProns, nVars = lex.stats()
+            nHeads, nProns, nVars = lex.stats()[:3]
             fileName = os.path.basename(lex.fileName)
             fileInfo = fmt(_('FILE: {fileName} '
                 '[{nHeads:,d} /{nProns:,d} ({nVars:,d})/]'))
@@ -94,10 +97,20 @@ def doCommands(lex, queue):
         '''Display answer, assumed to be a list of lines'''
         assert isinstance(answer, list), 'Unexpected non-list answer'
         if not answer:
-            print(__('No matching entries', '[None]'))
+            output(__('No matching entries', '[None]'))
         else:
             for line in answer:
-                print(line)
+                output(line)
+
+    def stream(lines):
+        '''Display lines one by one as they are produced, rather than all
+        at once like show'''
+        shown = False
+        for line in lines:
+            output(line)
+            shown = True
+        if not shown:
+            output(__('No matching entries', '[None]'))
 
     LANGUAGES = None  # set when first needed
     maxWidth = None   # set once or periodically by getWidth()
@@ -110,26 +123,28 @@ def doCommands(lex, queue):
         CMD.RELS: lambda s: nymsDisplay(lex, s, maxWidth),
         CMD.HOMS: lambda s: wordsDisplay(lex.homophones(s), maxWidth),
         CMD.ANAG: lambda s: wordsDisplay(lex.anagrams(s), maxWidth),
+        CMD.SUBA: lambda s: subanagramsDisplay(lex, s, maxWidth),
+        CMD.PHRA: lambda s: stream(phrasesDisplay(lex, s, maxWidth)),
         CMD.REGX: lambda s: wordsDisplay(lex.regex(s), maxWidth),
         CMD.AVBL: lambda s: wordsDisplay(languages(), maxWidth),
         CMD.LANG: lambda s: setLanguage(s),
-        CMD.QUIT: lambda s: sys.exit(STATUS.OK),
+        CMD.QUIT: lambda s: None,   # handled below
     }
     # Remove unavailable commands
+    unavailable = set()
     if not(lex.fileName or lex.hasWordNet):
-        del COMMANDS[CMD.WORD]
+        unavailable.add(CMD.WORD)
     if not lex.hasWordNet:
-        del COMMANDS[CMD.RELS]
-        del COMMANDS[CMD.LANG]
+        unavailable.update((CMD.RELS, CMD.LANG))
     if not lex.fileName:
-        del COMMANDS[CMD.HOMS]
-        del COMMANDS[CMD.ANAG]
-        del COMMANDS[CMD.REGX]
+        unavailable.update((CMD.HOMS, CMD.ANAG, CMD.SUBA, CMD.PHRA,
+                            CMD.REGX))
     # Reorganize remaining commands for name-based lookup
     CMDS = OrderedDict([
         (val.NAME, FN(val.NARGS, FUNCTIONS[key]))
-            for key, val in COMMANDS.items()
+            for key, val in COMMANDS.items() if key not in unavailable
         ])
+    QUIT = COMMANDS[CMD.QUIT].NAME
 
     getWidth()
     # get a command from the queue and execute it until the command is Quit
@@ -145,24 +160,29 @@ def doCommands(lex, queue):
         prefix, *args = queue.popleft().split() # removes spaces at ends
         candidates = prefixOf(CMDS.keys(), prefix)
         if not candidates:
-            print(fmt(_('! Unrecognized command "{prefix}"')))
+            output(fmt(_('! Unrecognized command "{prefix}"')))
             continue
         elif len(candidates) > 1:
-            print(fmt(_('! Ambiguous command "{prefix}"')))
+            output(fmt(_('! Ambiguous command "{prefix}"')))
             continue
         # there is only 1 candidate, and it's valid
         command = candidates[0]
         nargs = CMDS[command].NARGS
         if (nargs == 0 and len(args) > 0) or (nargs != 0 and len(args) == 0):
-            print(_('! Wrong number of arguments to command'))
+            output(_('! Wrong number of arguments to command'))
             continue
-        result = CMDS[command].FUNCT(' '.join(args)) # CMD.QUIT will exit here
+        if command == QUIT:
+            return
+        result = CMDS[command].FUNCT(' '.join(args))
         if result is not None:
             show(result)
 
 def conMain(options):
     queue = deque()
     commands = options[OPT.EXEC]
+    if commands:   # load WordNet only if one of the commands needs it
+        options = dict(options)
+        options[OPT.WARMUP] = False
     try:
         lex = lexicon.Lexicon(options, busyWait=None if commands else busyWait)
     except lexicon.LexiconError as err:
@@ -1,5 +1,5 @@
 # lexGui.py jcj 2019-02-27, 2019-04-23, 2019-11-20, 2020-02-11, 2020-03-20,
-#           2020-05-12, 2020-05-27
+#           2020-05-12, 2020-05-27, 2026-10-18
 
 '''
 PyQt-based graphical user interface for lexitron
@@ -63,6 +63,8 @@ class LBL:
     RELATED = COMMANDS[CMD.RELS].LABEL
     HOMOPHONES = COMMANDS[CMD.HOMS].LABEL
     ANAGRAMS = COMMANDS[CMD.ANAG].LABEL
+    SUBANAGRAMS = COMMANDS[CMD.SUBA].LABEL
+    PHRASES = COMMANDS[CMD.PHRA].LABEL
     REGEX = COMMANDS[CMD.REGX].LABEL
 
 DEFAULT_STYLESHEET = '''
@@ -198,6 +200,12 @@ class MainWindow(QMainWindow):
         self.anagramsButton = QRadioButton(LBL.ANAGRAMS, container)
         self.anagramsButton.toggled.connect(self.onToggle)
         self.anagramsButton.setEnabled(False)
+        self.subanagramsButton = QRadioButton(LBL.SUBANAGRAMS, container)
+        self.subanagramsButton.toggled.connect(self.onToggle)
+        self.subanagramsButton.setEnabled(False)
+        self.phrasesButton = QRadioButton(LBL.PHRASES, container)
+        self.phrasesButton.toggled.connect(self.onToggle)
+        self.phrasesButton.setEnabled(False)
         self.regexButton = QRadioButton(LBL.REGEX, container)
         self.regexButton.toggled.connect(self.onToggle)
         self.regexButton.setEnabled(False)
@@ -205,6 +213,8 @@ class MainWindow(QMainWindow):
         hBox.addWidget(self.relatedButton)
         hBox.addWidget(self.homophonesButton)
         hBox.addWidget(self.anagramsButton)
+        hBox.addWidget(self.subanagramsButton)
+        hBox.addWidget(self.phrasesButton)
         hBox.addWidget(self.regexButton)
         container.setLayout(hBox)
         self.vBox.addWidget(container)
@@ -339,7 +349,7 @@ class MainWindow(QMainWindow):
 
     def updateLexInfo(self):
         if self.fileName:
-            nHeads, nProns, nVars = self.lex.stats()
+            nHeads, nProns, nVars = self.lex.stats()[:3]
             fileName = os.path.basename(self.options[OPT.LEXICON])
             self.lexLabel.setText(fmt(_('File: {fileName}\n'
                                     '{nHeads:,d} /{nProns:,d} ({nVars:,d})/')))
@@ -352,6 +362,8 @@ class MainWindow(QMainWindow):
         self.relatedButton.setEnabled(self.lex.hasWordNet)
         self.homophonesButton.setEnabled(bool(self.fileName))
         self.anagramsButton.setEnabled(bool(self.fileName))
+        self.subanagramsButton.setEnabled(bool(self.fileName))
+        self.phrasesButton.setEnabled(bool(self.fileName))
         self.regexButton.setEnabled(bool(self.fileName))
 
     def about(self):
@@ -372,6 +384,21 @@ class MainWindow(QMainWindow):
         QMessageBox.warning(self, __('MessageBox Title', 'Warning'), message)
         self.resetFocusAndSelection()
 
+    def streamAnswer(self, lines):
+        '''Show lines in the results one by one as they are produced, and
+        return them as a list. The entry box is disabled meanwhile'''
+        answer = []
+        self.results.clear()
+        self.entryBox.setEnabled(False)
+        try:
+            for line in lines:
+                answer.append(line)
+                self.results.append(line)
+                QCoreApplication.processEvents()
+        finally:
+            self.entryBox.setEnabled(True)
+        return answer
+
     def busyWait(self, phase, percent):
         fileName = (os.path.basename(self.lex.fileName) if self.lex
                     else __('Reading lexicon file', '[Loading]'))
@@ -409,11 +436,14 @@ class MainWindow(QMainWindow):
             LBL.HOMOPHONES: lambda s: wordsDisplay
                                       (self.lex.homophones(s), width),
             LBL.ANAGRAMS: lambda s: wordsDisplay(self.lex.anagrams(s), width),
+            LBL.SUBANAGRAMS: lambda s: subanagramsDisplay(self.lex, s, width),
+            LBL.PHRASES: lambda s: self.streamAnswer(
+                                       phrasesDisplay(self.lex, s, width)),
             LBL.REGEX: lambda s: wordsDisplay(self.lex.regex(s), width),
             }
         try:
             answer = actions[self.action](text)
-        except lexicon.LexiconError as err:   # must be from the re module
+        except lexicon.LexiconError as err:   # from the re module or a timeout
             errorMessage = str(err)
             self.errorAlert(
                 fmt(_('There was a problem with the string or pattern:\n'
@@ -0,0 +1,448 @@
+# lexHttp.py jcj 2026-10-18
+
+'''
+A lexitron server answering queries over HTTP with JSON, for use by other
+tools. Each Lexicon method is an endpoint taking its argument as the query
+parameter q, eg GET /anagrams?q=beater, which answers
+    {"query": "beater", "results": ["beater", "berate", "rebate"],
+     "truncated": false, "seconds": 0.0001}
+or, if the query cannot be answered, {"error": "..."} with a 4xx or 5xx
+status. Every query may also give limit, the most results wanted, and
+/prefixed and /suffixed offset, the number of results to skip. GET /status
+describes the lexicon in use, including its generation, which goes up by
+one each time the lexicon file is reloaded.
+'''
+
+## Support for gettext
+# This file assumes that _ and pgettext have been injected
+# into the builtins namespace by the '__main__' file.
+# Python doesn't support pgettext until version 3.8. So...
+try:
+    pgettext
+except NameError:
+    from my.pgettext import pgettext
+__ = pgettext
+
+# standard-library imports
+import os
+import gc
+import sys
+import signal
+import socket
+import json
+import time
+import pickle
+import asyncio
+import traceback
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+
+# private imports
+from my.error import *          # PROGNAME, STATUS and error
+from my.textutils import *      # fmt
+
+# project imports
+import lexicon
+from lexWordNet import WordNetInfo
+from lexStrings import OPT
+from lexReload import LexiconReloader, buildAll
+from lexCache import MISSING
+
+MAX_RESULTS = 1000      # How many results are returned unless asked for more?
+MAX_LIMIT = 100000      # and how many at most?
+REQUEST_TIMEOUT = 10    # How many seconds may a query take, unless -t says?
+HEAD_TIMEOUT = 10       # How many seconds may a client take over its request?
+MAX_HEAD = 1 << 14      # How many bytes may the request line and headers take?
+WORKER_THREADS = 4      # How many slow queries may each process work on?
+FORKED_QUERIES = 4      # and how many unbounded ones, in children of its own?
+BACKLOG = 128           # How many connections may wait to be accepted?
+WAIT_INTERVAL = 0.5     # How often in seconds are workers checked on?
+
+# How a query is worked on: in the event loop, as it is quick; in a worker
+# thread, as it is slow but bounded; or, as there is no telling how long it
+# may take, in a child process forked for it, which can be killed if it
+# takes too long. A thread cannot be, and would go on hogging the GIL.
+QUICK, THREADED, FORKED = range(3)
+
+# endpoint -> (Lexicon method, how it is worked on, whether it takes
+# limit and offset itself)
+ENDPOINTS = { 'contains': ('contains', QUICK, False),
+              'prefixed': ('prefixed', QUICK, True),
+              'suffixed': ('suffixed', QUICK, True),
+              'pronunciations': ('pronunciations', QUICK, False),
+              'definitions': ('definitions', THREADED, False),
+              'related': ('related', THREADED, False),
+              'homophones': ('homophones', THREADED, False),
+              'anagrams': ('anagrams', THREADED, False),
+              'subanagrams': ('subanagrams', FORKED, False),
+              'regex': ('regex', FORKED, False) }
+STATUS_ENDPOINT = 'status'
+
+class RequestError(Exception):
+    '''A query which cannot be answered, and the HTTP status saying why'''
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def jsonable(result):
+    '''Return result with the WordNetInfo tuples in it turned into dicts'''
+    if isinstance(result, WordNetInfo):
+        return result._asdict()
+    if isinstance(result, (list, tuple)):
+        return [jsonable(item) for item in result]
+    return result
+
+def getCount(params, name, default, maximum):
+    '''Return the non-negative integer query parameter name, or default'''
+    val = params.get(name, [str(default)])[-1]
+    if not val.isdigit():
+        raise RequestError(HTTPStatus.BAD_REQUEST,
+                           fmt(_('{name} must be a whole number')))
+    return min(int(val), maximum)
+
+def runChild(lex, call, fd):
+    '''Write to the pipe fd the pickled result of call() as (True, result),
+    or (False, (whether it was a LexiconError, message)) if it fails. This
+    is the whole life of a child forked for a query.'''
+    # the signal handlers belong to the parent's event loop
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # search alone: the processes of a pool of our own would be left
+    # running if we were killed
+    lex.jobs = 1
+    try:
+        result = True, call()
+    except Exception as err:
+        result = False, (isinstance(err, lexicon.LexiconError), str(err))
+    with open(fd, 'wb') as f:
+        pickle.dump(result, f, pickle.HIGHEST_PROTOCOL)
+
+class LexiconServer:
+    '''Answers HTTP requests from a Lexicon, working on slow queries in
+    worker threads, and on those which may take any time at all in forked
+    children, so that quick ones are not kept waiting behind them. When
+    there are no threads or children to spare, queries needing them are
+    turned away rather than queued.'''
+
+    def __init__(self, lexicons, timeout):
+        self.lexicons = lexicons        # a LexiconReloader
+        self.timeout = timeout
+        self.workers = ThreadPoolExecutor(WORKER_THREADS)
+        self.threaded = 0               # queries the threads are busy with
+        self.forked = 0                 # children working on queries
+        self.active = set()             # requests being answered
+
+    async def handle(self, reader, writer):
+        '''Answer one request, then close the connection'''
+        task = asyncio.current_task()
+        self.active.add(task)
+        try:
+            await self.answer(reader, writer)
+        finally:
+            self.active.discard(task)
+
+    async def answer(self, reader, writer):
+        '''Read a request and write the answer'''
+        try:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'),
+                                              HEAD_TIMEOUT)
+            except asyncio.LimitOverrunError:
+                raise RequestError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                                   _('Request too large'))
+            status, body = await self.respond(head)
+        except RequestError as err:
+            status, body = err.status, {'error': str(err)}
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError,
+                ConnectionError):
+            writer.close()      # the client is too slow or has gone
+            return
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        code, phrase, length = status.value, status.phrase, len(data)
+        writer.write(fmt('HTTP/1.1 {code} {phrase}\r\n'
+                         'Content-Type: application/json; charset=utf-8\r\n'
+                         'Content-Length: {length}\r\n'
+                         'Connection: close\r\n\r\n').encode('latin-1'))
+        writer.write(data)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, head):
+        '''Return the status and body answering a request'''
+        try:
+            method, target, _version = head.decode('latin-1').split(
+                '\r\n', 1)[0].split(' ')
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, _('Bad request'))
+        if method != 'GET':
+            raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED,
+                               _('Only GET is supported'))
+        url = urlsplit(target)
+        if url.path.strip('/') == STATUS_ENDPOINT:
+            return HTTPStatus.OK, self.status()
+        endpoint = ENDPOINTS.get(url.path.strip('/'))
+        if endpoint is None:
+            path, names = url.path, ', '.join(ENDPOINTS)
+            raise RequestError(HTTPStatus.NOT_FOUND, fmt(_(
+                'Unknown query "{path}", try one of: {names}')))
+        methodName, mode, paged = endpoint
+        params = parse_qs(url.query)
+        if not params.get('q'):
+            raise RequestError(HTTPStatus.BAD_REQUEST,
+                               _('No query given in parameter q'))
+        query = params['q'][-1]
+        limit = getCount(params, 'limit', MAX_RESULTS, MAX_LIMIT)
+        offset = getCount(params, 'offset', 0, sys.maxsize)
+        start = time.perf_counter()
+        with self.lexicons.lexicon() as lex:
+            results = await self.query(lex, methodName, query,
+                                       limit, offset, mode, paged)
+        results = results or []
+        return HTTPStatus.OK, { 'query': query,
+                                'results': jsonable(results[:limit]),
+                                'truncated': len(results) > limit,
+                                'seconds': time.perf_counter() - start }
+
+    async def query(self, lex, methodName, query, limit, offset, mode,
+                    paged):
+        '''Return the results of a Lexicon method'''
+        method = getattr(lex, methodName)
+        if paged:   # ask for one more, to know if there are more
+            call = lambda: method(query, limit + 1, offset)
+        else:
+            call = lambda: method(query)
+        if mode == FORKED and not hasattr(os, 'fork'):
+            mode = THREADED
+        try:
+            if mode == FORKED:
+                key, call = getattr(lex, methodName + 'Query')(query)
+                return await self.runForked(lex, key, call)
+            elif mode == THREADED:
+                return await self.runThreaded(call)
+            else:
+                return call()
+        except asyncio.TimeoutError:
+            seconds = self.timeout
+            raise RequestError(HTTPStatus.GATEWAY_TIMEOUT, fmt(_(
+                'Query took longer than {seconds:g} seconds')))
+        except lexicon.LexiconError as err:   # eg an invalid regex
+            raise RequestError(HTTPStatus.BAD_REQUEST, str(err))
+        except RequestError:
+            raise
+        except Exception as err:
+            raise RequestError(HTTPStatus.INTERNAL_SERVER_ERROR, str(err))
+
+    async def runThreaded(self, call):
+        '''Return call() worked out in a worker thread. A thread cannot be
+        stopped, so one whose query has timed out is still busy with it
+        until it finishes, and counted as such.'''
+        if self.threaded >= WORKER_THREADS:
+            raise RequestError(HTTPStatus.SERVICE_UNAVAILABLE,
+                               _('Too busy, try again later'))
+        self.threaded += 1
+        future = self.workers.submit(call)
+        loop = asyncio.get_running_loop()
+        future.add_done_callback(
+            lambda future: loop.call_soon_threadsafe(self.threadDone))
+        return await asyncio.wait_for(asyncio.wrap_future(future),
+                                      self.timeout)
+
+    def threadDone(self):
+        self.threaded -= 1
+
+    async def runForked(self, lex, key, call):
+        '''Return the result cached in lex under key, or else call() worked
+        out in a child process forked for it, which shares the pages of lex
+        with this one, and is killed if it takes longer than self.timeout.
+        call must not use the cache itself: a worker thread may be holding
+        its lock when the child is forked, and then the child would wait
+        for it for ever. The result is cached here instead.'''
+        result = lex.cache.lookup(key, MISSING)
+        if result is not MISSING:
+            return result
+        if self.forked >= FORKED_QUERIES:
+            raise RequestError(HTTPStatus.SERVICE_UNAVAILABLE,
+                               _('Too busy, try again later'))
+        loop = asyncio.get_running_loop()
+        readFd, writeFd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os.close(readFd)
+                runChild(lex, call, writeFd)
+            finally:
+                os._exit(STATUS.OK)
+        os.close(writeFd)
+        self.forked += 1
+        reader = asyncio.StreamReader()
+        try:
+            transport, _protocol = await loop.connect_read_pipe(
+                lambda: asyncio.StreamReaderProtocol(reader),
+                open(readFd, 'rb'))
+            try:
+                data = await asyncio.wait_for(reader.read(), self.timeout)
+            finally:
+                transport.close()
+        finally:
+            self.forked -= 1
+            try:
+                os.kill(pid, signal.SIGKILL)    # in case it has not finished
+            except ProcessLookupError:
+                pass
+            os.waitpid(pid, 0)
+        if not data:
+            raise RequestError(HTTPStatus.INTERNAL_SERVER_ERROR,
+                               _('Query failed'))
+        ok, result = pickle.loads(data)
+        if ok:
+            lex.cache.put(key, result)
+            return result
+        lexiconError, message = result
+        if lexiconError:
+            raise lexicon.LexiconError(message)
+        raise RequestError(HTTPStatus.INTERNAL_SERVER_ERROR, message)
+
+    def status(self):
+        '''Return a description of the Lexicon being used and its file'''
+        lexicons = self.lexicons
+        with lexicons.lexicon() as lex:
+            lines, prons, variants = lex.stats()[:3]
+            return { 'lexicon': lex.fileName,
+                     'generation': lexicons.generation,
+                     'loadSeconds': lexicons.seconds,
+                     'lines': lines, 'pronunciations': prons,
+                     'variants': variants }
+
+    async def serve(self, sock):
+        '''Answer requests arriving on the listening sock until cancelled
+        or terminated, when the queries under way are finished first'''
+        loop = asyncio.get_running_loop()
+        stopping = loop.create_future()
+        stop = lambda: stopping.done() or stopping.set_result(None)
+        try:
+            loop.add_signal_handler(signal.SIGTERM, stop)
+        except (NotImplementedError, RuntimeError):  # not on this system
+            pass
+        server = await asyncio.start_server(self.handle, sock=sock,
+                                            limit=MAX_HEAD)
+        async with server:
+            await stopping
+        if self.active:
+            await asyncio.wait(self.active, timeout=self.timeout)
+
+def serveWorker(lexicons, timeout, sock):
+    '''Answer requests arriving on sock until interrupted'''
+    try:
+        asyncio.run(LexiconServer(lexicons, timeout).serve(sock))
+    except KeyboardInterrupt:
+        pass
+
+def forkWorkers(lexicons, timeout, sock, workers, interval):
+    '''Answer requests arriving on sock in workers forked processes, which
+    share the pages of the current Lexicon with this one until they write
+    to them, and take turns to accept connections. Replace any worker which
+    dies. If interval is given, check the lexicon file that often, and
+    when it changes load it afresh, fork new workers to share it and stop
+    the old ones once they have finished their queries. Do so until
+    interrupted or terminated.'''
+    children = set()    # workers sharing the current Lexicon
+    retiring = set()    # and those finishing with an older one
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            status = STATUS.FAIL    # unless it stops as it should
+            try:
+                serveWorker(lexicons, timeout, sock)
+                status = STATUS.OK
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                sys.stderr.flush()
+                os._exit(status)
+        children.add(pid)
+
+    def share():
+        # Move everything so far out of reach of the garbage collector,
+        # whose bookkeeping would otherwise write to, and so copy, every
+        # page holding a container of the lexicon in every worker
+        lexicons.current.warm.wait()    # no loading threads at a fork
+        gc.freeze()
+        for worker in range(workers):
+            spawn()
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(STATUS.OK))
+    try:
+        share()
+        checked = time.monotonic()
+        while True:
+            time.sleep(WAIT_INTERVAL)
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                pid = 0
+            if pid:
+                retiring.discard(pid)
+                if pid in children:
+                    children.discard(pid)
+                    if status:  # killed, or failed, rather than told to stop
+                        spawn()
+                continue        # there may be more to wait for
+            if not interval or time.monotonic() - checked < interval:
+                continue
+            checked = time.monotonic()
+            if lexicons.changed():
+                gc.unfreeze()   # so that the old Lexicon can be freed
+                lexicons.reload()
+                gc.collect()
+                for pid in children:
+                    os.kill(pid, signal.SIGTERM)
+                retiring |= children
+                children = set()
+                share()
+    except (KeyboardInterrupt, SystemExit):
+        for pid in children | retiring:
+            os.kill(pid, signal.SIGTERM)
+        for pid in children | retiring:
+            os.waitpid(pid, 0)
+
+def httpMain(options):
+    '''Load the lexicon and answer HTTP requests until interrupted'''
+    host, port = options[OPT.HTTP]
+    # a query taking too long is killed along with the child working on
+    # it, unless it is one of the bounded ones given to a thread
+    timeout = options[OPT.TIMEOUT] or REQUEST_TIMEOUT
+    options[OPT.TIMEOUT] = timeout
+    workers = options.get(OPT.WORKERS, 1) if hasattr(os, 'fork') else 1
+    interval = options.get(OPT.RELOAD, 0)
+    try:
+        sock = socket.create_server((host, port), backlog=BACKLOG)
+    except OSError as err:
+        error(STATUS.FAIL, fmt(_('Cannot listen on {host}:{port}: {err}')))
+    try:
+        lex = lexicon.Lexicon(options)
+    except lexicon.LexiconError as err:
+        error(STATUS.FAIL, str(err))
+    # build the indexes now rather than during the first queries, and in
+    # this process rather than once per worker
+    buildAll(lex)
+    lexicons = LexiconReloader(options, lex, buildAll)
+    del lex             # so that it can be freed once replaced
+    if workers > 1:
+        forkWorkers(lexicons, timeout, sock, workers, interval)
+    else:
+        if interval:
+            lexicons.watch(interval)
+        serveWorker(lexicons, timeout, sock)
+    sock.close()
+    sys.exit(STATUS.OK)
+
+if __name__ == '__main__':
+    print(_('This module is part of the Lexitron package'))
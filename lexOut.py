@@ -1,4 +1,4 @@
-# lexOut.py jcj 2020-05-11, 2020-05-27, 2020-05-31
+# lexOut.py jcj 2020-05-11, 2020-05-27, 2020-05-31, 2026-10-18
 
 '''Format lexicon data for output'''
 
@@ -18,7 +18,7 @@ from my.textutils import fmt
 
 __all__ = ['languageNames', 'languageName', 'languageCode', 'languageWidth',
            'headsDisplay', 'defsDisplay', 'nymsDisplay', 'wordsDisplay',
-           'busyPhase', 'busyWait']
+           'subanagramsDisplay', 'phrasesDisplay', 'busyPhase', 'busyWait']
 
 LG_CODE_TO_NAME = {
     # See https://en.wikipedia.org/wiki/ISO_639-3
@@ -206,6 +206,34 @@ def wordsDisplay(words, maxWidth=70):
     else:
         return wrap(words, width=maxWidth)
 
+def subanagramsDisplay(lex, letters, maxWidth=70):
+    '''Return a list of lines displaying the words which can be spelled
+    from letters, which may end with a number, after a space, giving the
+    fewest letters the words may have. Text is wrapped as by wordsDisplay'''
+    parts = letters.split()
+    if len(parts) > 1 and parts[-1].isdigit():
+        words = lex.subanagrams(' '.join(parts[:-1]), int(parts[-1]))
+    else:
+        words = lex.subanagrams(letters)
+    return wordsDisplay(words, maxWidth)
+
+def phrasesDisplay(lex, letters, maxWidth=70):
+    '''Yield lines displaying the phrases which are anagrams of letters,
+    one by one as they are found. letters may end with a number, after a
+    space, giving the most words a phrase may have. Text is cut off at
+    maxWidth, unless maxWidth == 0, in which case the output is HTML.'''
+    parts = letters.split()
+    if len(parts) > 1 and parts[-1].isdigit():
+        phrases = lex.phraseAnagrams(' '.join(parts[:-1]), int(parts[-1]))
+    else:
+        phrases = lex.phraseAnagrams(letters)
+    for phrase in phrases:
+        phrase = phrase.replace('_', ' ')
+        if maxWidth == 0:
+            yield fmt('<p class="words">{phrase}</p>')
+        else:
+            yield phrase[:maxWidth]
+
 def busyPhase(index):
     '''Return the string for busy phase #index'''
     return PHASE_STRINGS[index]
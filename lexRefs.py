@@ -0,0 +1,93 @@
+# lexRefs.py jcj 2026-10-18
+
+'''The mapping from normalized words to their reference forms. Most words
+have only one form, which unless case or diacritics are ignored is the
+normalized word itself, so a lone form is stored as a bare string, and as
+the very key when it is equal to it: lists are only made for the keys
+which really collapse several forms, eg POLISH -> [Polish, polish].'''
+
+__all__ = ['RefMap']
+
+class RefMap:
+    '''A mapping from normalized words to lists of their reference forms,
+    in the order in which they were added. The lists it returns must not
+    be modified: use add and discard instead.'''
+
+    def __init__(self, items=()):
+        self.forms = {}     # normal -> its lone form, or a list of them
+        for normal, forms in items:
+            for word in forms:
+                self.add(normal, word)
+
+    def add(self, normal, word):
+        '''Add word as a reference form of normal'''
+        forms = self.forms.get(normal)
+        if forms is None:
+            self.forms[normal] = normal if word == normal else word
+        elif type(forms) is str:
+            self.forms[normal] = [forms, word]
+        else:
+            forms.append(word)
+
+    def discard(self, normal, word):
+        '''Remove word as a reference form of normal, and normal too if it
+        has no other form left. Return whether it was there to remove'''
+        forms = self.forms.get(normal)
+        if forms is None:
+            return False
+        if type(forms) is str:
+            if forms != word:
+                return False
+            del self.forms[normal]
+            return True
+        if word not in forms:
+            return False
+        forms.remove(word)
+        if len(forms) == 1:   # it is a lone form again
+            self.forms[normal] = normal if forms[0] == normal else forms[0]
+        return True
+
+    def extend(self, out, words):
+        '''Append the forms of each of words in turn to the list out, and
+        return it'''
+        allForms = self.forms
+        for word in words:
+            forms = allForms[word]
+            if type(forms) is str:
+                out.append(forms)
+            else:
+                out.extend(forms)
+        return out
+
+    def __getitem__(self, normal):
+        forms = self.forms[normal]
+        return [forms] if type(forms) is str else forms
+
+    def get(self, normal, default=None):
+        forms = self.forms.get(normal)
+        if forms is None:
+            return default
+        return [forms] if type(forms) is str else forms
+
+    def __contains__(self, normal):
+        return normal in self.forms
+
+    def __len__(self):
+        return len(self.forms)
+
+    def __iter__(self):
+        return iter(self.forms)
+
+    def keys(self):
+        return self.forms.keys()
+
+    def values(self):
+        return ([forms] if type(forms) is str else forms
+                for forms in self.forms.values())
+
+    def items(self):
+        return ((normal, [forms] if type(forms) is str else forms)
+                for normal, forms in self.forms.items())
+
+if __name__ == '__main__':
+    print('This module is intended to be imported rather than run standalone')
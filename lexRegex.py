@@ -0,0 +1,199 @@
+# lexRegex.py jcj 2026-10-18
+
+'''Helpers which let Lexicon.regex avoid matching a pattern against every
+word in the lexicon'''
+
+# Standard-library imports
+import re
+import bisect
+from array import array
+try:
+    import re._parser as sre_parse    # Python 3.11 onwards
+except ImportError:
+    import sre_parse
+
+__all__ = ['requiredLiterals', 'ngrams', 'lineStarts', 'bufferable',
+           'bufferSearch']
+
+# Opcodes whose single argument is a list of items which must all match
+GROUPS = {op for op in (getattr(sre_parse, 'ATOMIC_GROUP', None),) if op}
+# Opcodes which repeat a list of items a minimum number of times
+REPEATS = {op for op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT,
+                         getattr(sre_parse, 'POSSESSIVE_REPEAT', None)) if op}
+
+# ASCII characters which, ignoring case, match only characters whose
+# casefolded form is their lower-case form ('i' also matches dotless 'ı')
+FOLDABLE = {chr(c) for c in range(128)} - {'i', 'I'}
+
+def requiredLiterals(regex, folded=False):
+    '''Return a list of the literal strings which must occur in any string
+    matched by the compiled regex. Parts of the pattern which ignore
+    case contribute only if folded is set, meaning that the strings to be
+    matched have been casefolded, and then only for FOLDABLE literals.
+    An empty list means there is nothing certain to look for.'''
+    try:
+        parsed = sre_parse.parse(regex.pattern, regex.flags)
+    except Exception:    # unsupported by this version of the parser
+        return []
+    state = getattr(parsed, 'state', None) or parsed.pattern
+    literals = []
+
+    def flush(run):
+        if run:
+            literals.append(''.join(run))
+            del run[:]
+
+    def walk(items, ignoreCase):
+        run = []
+        for op, av in items:
+            if op == sre_parse.LITERAL and not ignoreCase:
+                run.append(chr(av))
+                continue
+            if op == sre_parse.LITERAL and folded and chr(av) in FOLDABLE:
+                run.append(chr(av).lower())
+                continue
+            flush(run)
+            if op == sre_parse.SUBPATTERN:
+                # (group, add_flags, del_flags, items) or (group, items)
+                flags = ignoreCase
+                if len(av) == 4:
+                    if av[1] & re.IGNORECASE:
+                        flags = True
+                    if av[2] & re.IGNORECASE:
+                        flags = False
+                walk(av[-1], flags)
+            elif op in GROUPS:
+                walk(av, ignoreCase)
+            elif op in REPEATS and av[0] >= 1:
+                walk(av[2], ignoreCase)
+            # anything else, eg a branch or a set, may match in many ways
+        flush(run)
+
+    walk(parsed, bool(state.flags & re.IGNORECASE))
+    return literals
+
+def nodes(items, flags=0):
+    '''Yield every (opcode, argument, flags) triple in a parsed pattern,
+    including those nested within groups, repeats, branches and the like,
+    with the flags in force there, starting from flags'''
+    for op, av in items:
+        yield op, av, flags
+        if op == sre_parse.SUBPATTERN:
+            # (group, add_flags, del_flags, items) or (group, items)
+            inner = (flags | av[1]) & ~av[2] if len(av) == 4 else flags
+            yield from nodes(av[-1], inner)
+        elif op in GROUPS:
+            yield from nodes(av, flags)
+        elif op in REPEATS:
+            yield from nodes(av[2], flags)
+        elif op in LOOKAROUNDS:
+            yield from nodes(av[1], flags)
+        elif op == sre_parse.BRANCH:
+            for branch in av[1]:
+                yield from nodes(branch, flags)
+        elif op == sre_parse.GROUPREF_EXISTS:
+            for branch in av[1:]:
+                if branch:
+                    yield from nodes(branch, flags)
+
+# Parts of a pattern which could behave differently when a line is searched
+# within the buffer of all lines rather than on its own: lookarounds can
+# see the neighbouring newlines, and \A and \Z match only at the ends of
+# the buffer. (Position codes are numbered apart from opcodes.)
+LOOKAROUNDS = {sre_parse.ASSERT, sre_parse.ASSERT_NOT}
+STRING_ENDS = {sre_parse.AT_BEGINNING_STRING, sre_parse.AT_END_STRING}
+
+# Character classes which match a newline. One of them lets a match run
+# on from line to line through the rest of the buffer before failing, so
+# that searching the buffer takes time quadratic in its size
+NEWLINE = ord('\n')
+NEWLINE_CATEGORIES = {sre_parse.CATEGORY_NOT_DIGIT, sre_parse.CATEGORY_SPACE,
+                      sre_parse.CATEGORY_NOT_WORD,
+                      sre_parse.CATEGORY_LINEBREAK}
+
+def matchesNewline(op, av, flags):
+    '''Return whether the parsed item op, av can match a newline'''
+    if op == sre_parse.NOT_LITERAL:
+        return av != NEWLINE
+    if op == sre_parse.ANY:
+        return bool(flags & re.DOTALL)
+    if op != sre_parse.IN:
+        return False
+    negated = False
+    for kind, arg in av:
+        if kind == sre_parse.NEGATE:
+            negated = True
+        elif ((kind == sre_parse.LITERAL and arg == NEWLINE) or
+              (kind == sre_parse.RANGE and arg[0] <= NEWLINE <= arg[1]) or
+              (kind == sre_parse.CATEGORY and arg in NEWLINE_CATEGORIES)):
+            return not negated
+    return negated
+
+def bufferable(regex):
+    '''Return whether bufferSearch gives the right answers for regex, and
+    gives them quickly'''
+    try:
+        parsed = sre_parse.parse(regex.pattern, regex.flags)
+    except Exception:
+        return False
+    state = getattr(parsed, 'state', None) or parsed.pattern
+    for op, av, flags in nodes(parsed, state.flags):
+        if op in LOOKAROUNDS or (op == sre_parse.AT and av in STRING_ENDS):
+            return False
+        if matchesNewline(op, av, flags):
+            return False
+    return True
+
+def lineStarts(lines):
+    '''Return an array of the offsets at which each of lines starts
+    in '\\n'.join(lines)'''
+    starts = array('I')
+    if sum(map(len, lines)) + len(lines) >= 1 << (8 * starts.itemsize):
+        starts = array('Q')
+    offset = 0
+    for line in lines:
+        starts.append(offset)
+        offset += len(line) + 1
+    return starts
+
+# bufferSearch gives up on the buffer if, after each DENSE_CHECK matches,
+# more than one line in DENSE has matched so far
+DENSE_CHECK = 64
+DENSE = 8
+
+def bufferSearch(regex, lines, buffer, starts):
+    '''Return the ascending numbers of the lines matched by regex, given
+    also the buffer of the lines joined by newlines and the offsets at
+    which they start in it. The buffer is searched from line to line in
+    C, with ^ and $ matching at the ends of lines, which saves a Python
+    call per line when few of them match; a match which runs on into the
+    next line is rechecked against its own line. Once matches are found
+    to be common, the rest of the lines are searched one by one instead.
+    Only use this if bufferable(regex).'''
+    search = re.compile(regex.pattern, regex.flags | re.MULTILINE).search
+    hits = []
+    numLines = len(starts)
+    end = len(buffer)
+    pos = 0
+    while numLines and pos <= end:
+        m = search(buffer, pos)
+        if not m:
+            break
+        line = bisect.bisect_right(starts, m.start()) - 1
+        lineEnd = starts[line + 1] - 1 if line + 1 < numLines else end
+        if m.end() <= lineEnd or regex.search(lines[line]):
+            hits.append(line)
+            if len(hits) % DENSE_CHECK == 0 and len(hits) * DENSE > line:
+                match = regex.search
+                hits.extend(i for i, word in enumerate(lines[line+1:], line+1)
+                            if match(word))
+                break
+        pos = lineEnd + 1       # on to the next line
+    return hits
+
+def ngrams(s, n):
+    '''Return the set of n-character substrings of s'''
+    return {s[i:i+n] for i in range(len(s) - n + 1)}
+
+if __name__ == '__main__':
+    print('This module is intended to be imported rather than run standalone')
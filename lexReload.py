@@ -0,0 +1,141 @@
+# lexReload.py jcj 2026-10-18
+
+'''
+Keeps a resident server's Lexicon up to date with its lexicon file,
+building a new one in the background whenever the file changes and
+swapping it in once it is complete, so that queries are never kept
+waiting for it
+'''
+
+## Support for gettext
+# This file assumes that _ and pgettext have been injected
+# into the builtins namespace by the '__main__' file.
+# Python doesn't support pgettext until version 3.8. So...
+try:
+    pgettext
+except NameError:
+    from my.pgettext import pgettext
+__ = pgettext
+
+# standard-library imports
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+# private imports
+from my.error import *          # PROGNAME
+from my.textutils import *      # fmt
+
+# project imports
+import lexicon
+from lexStrings import OPT
+
+def buildAll(lex):
+    '''Build every index of lex now rather than during the first queries
+    needing them: the usual prepare function of a LexiconReloader, so that
+    only complete Lexicons are swapped in'''
+    lex.buildIndexes(*lex.LAZY_INDEXES)
+
+class LexiconReloader:
+    '''Holds the current generation of a Lexicon, numbered from 1, and
+    builds the next one from the lexicon file when it changes. A query
+    takes the current Lexicon with lexicon() and keeps it until done, even
+    if a newer one is swapped in meanwhile. The processes searching an old
+    Lexicon are stopped once its last query is done.'''
+
+    def __init__(self, options, lex, prepare=None):
+        self.options = options
+        self.current = lex
+        self.generation = 1
+        self.seconds = 0.0              # taken to build the current one
+        self.prepare = prepare          # called on each new Lexicon
+        self.lock = threading.Lock()
+        self.users = Counter()          # Lexicon -> queries using it
+        self.retired = set()            # old ones still in use
+        self.loaded = self.signature()  # the file as last loaded
+        self.seen = self.loaded         # and as last checked
+
+    def signature(self):
+        '''Return what identifies the state of the lexicon file, or None if
+        it cannot be read'''
+        try:
+            info = os.stat(self.options[OPT.LEXICON])
+        except OSError:
+            return None
+        return info.st_ino, info.st_size, info.st_mtime_ns
+
+    def changed(self):
+        '''Return whether the lexicon file has changed since it was loaded
+        and has stayed the same since last checked, so is not still being
+        written'''
+        seen, self.seen = self.seen, self.signature()
+        return self.seen is not None and self.seen == seen != self.loaded
+
+    def reload(self):
+        '''Build a Lexicon from the lexicon file as it is now and make it
+        the current one, returning it, or return None if it cannot be
+        built. The previous one is left in use by queries already under
+        way.'''
+        signature = self.seen
+        start = time.perf_counter()
+        try:
+            lex = lexicon.Lexicon(self.options)
+            if self.prepare:
+                self.prepare(lex)
+        except Exception as err:
+            self.loaded = signature     # don't try again until it changes
+            print(fmt(_('{PROGNAME}: cannot reload lexicon: {err}')),
+                  file=sys.stderr)
+            return None
+        seconds = time.perf_counter() - start
+        with self.lock:
+            old, self.current = self.current, lex
+            self.generation += 1
+            self.seconds = seconds
+            self.loaded = signature
+            if self.users[old]:
+                self.retired.add(old)
+            else:
+                self.users.pop(old, None)
+                old.closeSearchPool()
+        generation, fileName = self.generation, self.options[OPT.LEXICON]
+        print(fmt(_('{PROGNAME}: loaded {fileName} as generation '
+                    '{generation} in {seconds:.2f} seconds')),
+              file=sys.stderr)
+        return lex
+
+    @contextmanager
+    def lexicon(self):
+        '''Lend the current Lexicon for the duration of a query'''
+        with self.lock:
+            lex = self.current
+            self.users[lex] += 1
+        try:
+            yield lex
+        finally:
+            with self.lock:
+                self.users[lex] -= 1
+                done = False
+                if not self.users[lex]:
+                    # no key is kept for it, which would keep it alive
+                    del self.users[lex]
+                    done = lex in self.retired
+                    self.retired.discard(lex)
+            if done:
+                lex.closeSearchPool()
+
+    def watch(self, interval):
+        '''Check the lexicon file every interval seconds in a background
+        thread, reloading it whenever it changes'''
+        def watcher():
+            while True:
+                time.sleep(interval)
+                if self.changed():
+                    self.reload()
+        threading.Thread(target=watcher, daemon=True).start()
+
+if __name__ == '__main__':
+    print(_('This module is part of the Lexitron package'))
@@ -0,0 +1,157 @@
+# lexServe.py jcj 2026-10-18
+
+'''
+A resident lexitron server, which loads a Lexicon once and answers
+console-style commands sent to it over a Unix-domain socket, and the thin
+client which sends them
+'''
+
+## Support for gettext
+# This file assumes that _ and pgettext have been injected
+# into the builtins namespace by the '__main__' file.
+# Python doesn't support pgettext until version 3.8. So...
+try:
+    pgettext
+except NameError:
+    from my.pgettext import pgettext
+__ = pgettext
+
+# standard-library imports
+import os
+import sys
+import socket
+import signal
+from collections import deque
+
+# private imports
+from my.error import *          # PROGNAME, STATUS and error
+from my.textutils import *      # fmt
+
+# project imports (the server's are imported by serveMain, so that the
+# client stays quick to start)
+from lexStrings import OPT, CMD, COMMANDS
+
+# The first line a client sends is PROTOCOL followed by the width of its
+# terminal; each later line is a command. The server answers with lines
+# of output until it closes the connection
+PROTOCOL = 'lexitron/1'
+MAX_REQUEST = 1 << 16   # How many bytes of commands may a client send?
+BACKLOG = 16            # How many clients may wait to be answered?
+MIN_COLUMNS = 20        # How narrow may the answers be wrapped?
+CLIENT_TIMEOUT = 10     # How many seconds may a client take to send or read?
+ENCODING = 'utf-8'
+
+def clientMain(options):
+    '''Send the commands in options to the server listening on the socket
+    in options, printing the answers as they arrive'''
+    try:
+        columns = os.get_terminal_size(sys.stdout.fileno()).columns
+    except OSError:     # not a terminal
+        columns = 80
+    request = '\n'.join([fmt('{PROTOCOL} {columns}')] +
+                        [cmd.strip() for command in options[OPT.EXEC]
+                         for cmd in command.split(';')])
+    socketName = options[OPT.SOCKET]
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(socketName)
+        except OSError as err:
+            error(STATUS.FAIL, fmt(_('No server on "{socketName}": {err}')))
+        client.sendall((request + '\n').encode(ENCODING))
+        client.shutdown(socket.SHUT_WR)
+        with client.makefile('r', encoding=ENCODING) as answers:
+            for line in answers:
+                sys.stdout.write(line)
+    sys.exit(STATUS.OK)
+
+def serveMain(options):
+    '''Load the lexicon and answer clients, one at a time, until
+    interrupted'''
+    import lexicon
+    from lexCon import doCommands
+    from lexReload import LexiconReloader, buildAll
+    socketName = options[OPT.SOCKET]
+    try:
+        lex = lexicon.Lexicon(options)
+    except lexicon.LexiconError as err:
+        error(STATUS.FAIL, str(err))
+    server = listen(socketName)
+    language = lex.getLanguage()
+    # build the indexes now, and those of each reloaded Lexicon before it
+    # is swapped in, rather than during the first queries needing them
+    buildAll(lex)
+    lexicons = LexiconReloader(options, lex, buildAll)
+    del lex             # so that it can be freed once replaced
+    if options.get(OPT.RELOAD):
+        lexicons.watch(options[OPT.RELOAD])
+    # tidy up when killed, as when interrupted
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(STATUS.OK))
+    try:
+        while True:
+            client, address = server.accept()
+            with client, lexicons.lexicon() as lex:
+                client.settimeout(CLIENT_TIMEOUT)
+                try:
+                    answer(lex, client, doCommands)
+                except OSError:   # the client has gone, or is too slow
+                    pass
+                # each client starts afresh, whatever the last one did
+                if lex.getLanguage() != language:
+                    lex.setLanguage(language)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        os.remove(socketName)
+    sys.exit(STATUS.OK)
+
+def listen(socketName):
+    '''Return a socket listening on socketName, replacing any left behind
+    by a server which has gone, but not one which is still running'''
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socketName)
+        except OSError:
+            pass
+        else:
+            error(STATUS.FAIL, fmt(_('A server is already running on '
+                                     '"{socketName}"')))
+    if os.path.exists(socketName):
+        os.remove(socketName)
+    os.makedirs(os.path.dirname(os.path.abspath(socketName)), exist_ok=True)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    oldMask = os.umask(0o077)    # only this user may connect
+    try:
+        server.bind(socketName)
+    finally:
+        os.umask(oldMask)
+    server.listen(BACKLOG)
+    return server
+
+def answer(lex, client, doCommands):
+    '''Read a client's request, run its commands and stream back the
+    output'''
+    request = b''
+    while len(request) <= MAX_REQUEST:
+        data = client.recv(4096)
+        if not data:
+            break
+        request += data
+    lines = request.decode(ENCODING, errors='replace').splitlines()
+    if not lines or not lines[0].startswith(PROTOCOL + ' '):
+        return
+    try:
+        columns = max(int(lines[0].split()[1]), MIN_COLUMNS)
+    except ValueError:
+        columns = 80
+    queue = deque(line for line in lines[1:] if line.strip())
+    queue.append(COMMANDS[CMD.QUIT].NAME)
+    with client.makefile('w', encoding=ENCODING) as out:
+        output = lambda line: out.write(line + '\n')
+        try:
+            doCommands(lex, queue, output, columns)
+        except Exception as err:   # the server must survive this
+            output(fmt('! {err}'))
+
+if __name__ == '__main__':
+    print(_('This module is part of the Lexitron package'))
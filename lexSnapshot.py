@@ -0,0 +1,145 @@
+# lexSnapshot.py jcj 2026-10-18
+
+'''Save and restore versioned on-disk snapshots of the indexes built by
+a Lexicon, so that an unchanged lexicon file need not be re-read and
+re-indexed every time the program starts.
+
+Each index is a separately pickled section of the file, which is
+memory-mapped when loaded, so that only the sections asked for are read
+and unpickled. The plain indexes are dicts and lists of millions of
+strings, which have no layout Python can use in place, so some parsing
+is unavoidable: pickle is the quickest way to rebuild them. The compact
+indexes (see lexCompact) are a few buffers and arrays each, which
+unpickle at little more than the cost of copying them. A section may
+also be raw bytes copied from a file, which are used where they lie.'''
+
+# Standard-library imports
+import os
+import mmap
+import struct
+import pickle
+import shutil
+import hashlib
+import tempfile
+
+__all__ = ['Snapshot', 'snapshotKey', 'snapshotPath', 'saveSnapshot',
+           'loadSnapshot']
+
+MAGIC = b'LEXSNAP\0'
+FORMAT = 3                  # version of the container layout itself
+PREFIX = struct.Struct('<8sIQQ')  # magic, format, offset and length of
+                                  # the header, which follows the sections
+
+def snapshotKey(fileName, version, *options):
+    '''Return the key identifying the lexicon file as it is now: its path,
+    size and modification time, plus the index version and any options
+    which affect the contents of the indexes'''
+    info = os.stat(fileName)
+    return ((os.path.abspath(fileName), info.st_size, info.st_mtime_ns,
+             version) + options)
+
+def snapshotPath(cacheDir, key):
+    '''Return the name of the snapshot file for key. Only the path and the
+    options determine the name, so a changed file overwrites its
+    stale snapshot rather than leaving it lying around'''
+    path, size, mtime, version, *options = key
+    name = hashlib.sha1(repr((path, options)).encode()).hexdigest()
+    return os.path.join(cacheDir, name + '.snap')
+
+def saveSnapshot(fileName, key, sections):
+    '''Write the dict of sections to fileName along with key. Each section
+    is pickled straight into the file, or if it is an open binary file,
+    copied into it as it is, and the header locating them written after
+    them, so that no more than one is ever held pickled in memory.
+    The file is written under a temporary name and then renamed, so that
+    readers never see a partial snapshot. Return whether the snapshot was
+    written.'''
+    dirName = os.path.dirname(fileName)
+    tmpName = None
+    try:
+        os.makedirs(dirName, exist_ok=True)
+        fd, tmpName = tempfile.mkstemp(dir=dirName, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(PREFIX.pack(MAGIC, FORMAT, 0, 0))   # filled in below
+            toc = {}
+            for name, value in sections.items():
+                offset = f.tell()
+                raw = hasattr(value, 'read')
+                if raw:
+                    value.seek(0)
+                    shutil.copyfileobj(value, f)
+                else:
+                    pickle.dump(value, f, pickle.HIGHEST_PROTOCOL)
+                toc[name] = (offset, f.tell() - offset, raw)
+            offset = f.tell()
+            pickle.dump((key, toc), f, pickle.HIGHEST_PROTOCOL)
+            length = f.tell() - offset
+            f.seek(0)
+            f.write(PREFIX.pack(MAGIC, FORMAT, offset, length))
+        os.replace(tmpName, fileName)
+    except OSError:
+        if tmpName and os.path.exists(tmpName):
+            os.remove(tmpName)
+        return False
+    return True
+
+def loadSnapshot(fileName, key, stale=False):
+    '''Return a Snapshot for fileName if it exists and was made with key,
+    otherwise None. If stale is set, a snapshot of an earlier state of the
+    same file, made with the same version and options, will do.'''
+    try:
+        with open(fileName, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):   # missing, unreadable or empty
+        return None
+    try:
+        magic, version, offset, length = PREFIX.unpack_from(buffer)
+        if magic != MAGIC or version != FORMAT:
+            raise ValueError('not a snapshot')
+        fileKey, toc = pickle.loads(buffer[offset:offset+length])
+        if fileKey != key and not (stale and sameFile(fileKey, key)):
+            raise ValueError('stale snapshot')
+    except Exception:
+        buffer.close()
+        return None
+    return Snapshot(buffer, toc)
+
+def sameFile(key, other):
+    '''Return whether two keys are for the same file, version and options,
+    whether or not the file has changed in between'''
+    path, size, mtime, version, *options = key
+    otherPath, otherSize, otherMtime, otherVersion, *otherOptions = other
+    return (path, version, options) == (otherPath, otherVersion, otherOptions)
+
+class Snapshot:
+    '''A read-only view of the sections of a snapshot file. The file is
+    memory-mapped, so only the sections actually asked for are paged in'''
+
+    def __init__(self, buffer, toc):
+        self.buffer = buffer
+        self.toc = toc          # name -> offset and length of its section,
+                                # and whether it is raw rather than pickled
+
+    def __contains__(self, name):
+        return name in self.toc
+
+    def section(self, name):
+        '''Return the value stored under name'''
+        offset, length, raw = self.toc[name]
+        if raw:
+            return self.buffer[offset:offset+length]
+        with memoryview(self.buffer) as view:
+            return pickle.loads(view[offset:offset+length])
+
+    def region(self, name):
+        '''Return the memory-mapped buffer of the snapshot and the start and
+        end in it of the raw section name, so that it can be read without
+        copying it all'''
+        offset, length, raw = self.toc[name]
+        return self.buffer, offset, offset + length
+
+    def close(self):
+        self.buffer.close()
+
+if __name__ == '__main__':
+    print('This module is intended to be imported rather than run standalone')
@@ -1,4 +1,5 @@
-# lexStrings.py jcj 2020-02-06, 2020-02-11, 2020-05-27, 2020-06-02, 2021-03-27
+# lexStrings.py jcj 2020-02-06, 2020-02-11, 2020-05-27, 2020-06-02, 2021-03-27,
+#               2026-10-18
 
 '''
 Constant strings used in multiple modules of lexitron
@@ -38,6 +39,12 @@ class ENV:
     PATH_NAME = 'lexitron'
     ICON_FILE = 'lexitron.png'
     CONFIG_FILE = '.lexitronrc'
+    CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME',
+                             os.path.join(os.path.expanduser('~'), '.cache')),
+                             PATH_NAME)
+    WORDNET_STORE = os.path.join(CACHE_DIR, 'wordnet.sqlite')
+    SOCKET_FILE = os.path.join(os.environ.get('XDG_RUNTIME_DIR', CACHE_DIR),
+                               PATH_NAME + '.sock')
 
 class URLS:
     CMU = 'http://www.speech.cs.cmu.edu/cgi-bin/cmudict'
@@ -84,13 +91,16 @@ class ID:
                  'for complete documentation.'))
  
 # Keys in options dictionary 
-OPT = StrConsts('icase, idiac, interface, language, lexicon, style, exec')
+OPT = StrConsts('icase, idiac, interface, language, lexicon, style, exec, '
+               'cache, jobs, timeout, wordnet, warmup, serve, socket, http, '
+               'workers, reload, compact')
 
 # Types of user interface
 INTER = StrConsts('console, terminal, graphic')
 
 # Command strings
-CMD = StrConsts('help, stat, word, rels, anag, homs, regx, avbl, lang, quit')
+CMD = StrConsts('help, stat, word, rels, anag, suba, phra, homs, regx, avbl, '
+               'lang, quit')
 
 CS = namedtuple('COMMAND_SET',  # info keyed to arbitrary 4-char ID
                 'NAME,'   # string representing the command
@@ -118,6 +128,14 @@ COMMANDS = OrderedDict([
                   __('Button G1', '&Anagrams'),
                   __('Menu T1, no spaces', 'A)nagrams'),
                   __('Keypress: A)nagrams', 'A'), 1)),
+    (CMD.SUBA, CS(__('Menu C1, refers to letters, no spaces', 'Subanagrams'),
+                  __('Button G1, refers to letters', '&Subanagrams'),
+                  __('Menu T1, refers to letters, no spaces', 'S)ubwords'),
+                  __('Keypress: S)ubwords', 'S'), 1)),
+    (CMD.PHRA, CS(__('Menu C1, refers to anagrams, no spaces', 'Phrases'),
+                  __('Button G1, refers to anagrams', '&Phrases'),
+                  __('Menu T1, refers to anagrams, no spaces', 'P)hrase'),
+                  __('Keypress: P)hrase', 'P'), 1)),
     (CMD.REGX, CS(__('Menu C1, no spaces', 'Regex'),
                   __('Button G1', 'Re&gex'),
                   __('Menu T1, no spaces', 'ReG)ex'),
@@ -1,5 +1,5 @@
 # lexTerm.py jcj 2019-07-08, 2020-02-11, 2020-02-18, 2020-05-12, 2020-05-25,
-#            2020-06-02
+#            2020-06-02, 2026-10-18
 
 '''A VT-100-style smart-terminal interface for lexitron'''
 
@@ -78,21 +78,35 @@ def interact(lex):
                          languageWidth(languageName(lex.getLanguage())))
             return [fmt(_('[Language "{candidate}" set]'))]
 
-    def showAnswer(lines):
-        assert isinstance(lines, list), 'Unexpected non-list lines'
-        if not lines:
-            lines = [__('No matching entries', '[None]')]
+    def showAnswer(answer):
+        '''Show answer, a list or an iterator of lines, a screenful at a
+        time. The lines of an iterator are shown as they are produced'''
+        lines = []
+        pending = iter(answer)
+
+        def fetch(count):
+            '''Fetch lines until there are count of them, if there are
+            that many, and return how many there are'''
+            nonlocal pending
+            while pending is not None and len(lines) < count:
+                try:
+                    lines.append(next(pending))
+                except StopIteration:
+                    pending = None
+            return len(lines)
+
+        if not fetch(1):
+            lines.append(__('No matching entries', '[None]'))
         # need to show a screenful at a time
         pageFull = ymax - 5 - YOFFSET
-        length = len(lines)
         start = 0
         while True:
             for i in range(pageFull):
                 gotoxy(XOFFSET, YOFFSET + i)
                 clreol()
-                if start + i < length:
+                if start + i < fetch(start + i + 1):
                     display(lines[start+i])
-            if start + i >= length:
+            if start + i >= fetch(start + i + 1):
                 return
             gotoxy(XOFFSET, YOFFSET+pageFull)
             display(__('Key menu 2 (all items): keypresses available '
@@ -110,7 +124,8 @@ def interact(lex):
                     start = max(0, start - pageFull)
                     break
                 elif key in forwards:
-                    start = min(length - pageFull, start + pageFull)
+                    start = min(fetch(start + 2 * pageFull) - pageFull,
+                                start + pageFull)
                     break
 
 
@@ -123,7 +138,7 @@ def interact(lex):
 
     # Initialize window dimensions
     MIN_YMAX = 24
-    MIN_XMAX = 70
+    MIN_XMAX = 80   # wide enough for the menu of commands
     NCOLS = 16
     XOFFSET = 8
     YOFFSET = 2
@@ -138,6 +153,8 @@ def interact(lex):
         CMD.RELS: lambda s: nymsDisplay(lex, s, maxWidth),
         CMD.HOMS: lambda s: wordsDisplay(lex.homophones(s), maxWidth),
         CMD.ANAG: lambda s: wordsDisplay(lex.anagrams(s), maxWidth),
+        CMD.SUBA: lambda s: subanagramsDisplay(lex, s, maxWidth),
+        CMD.PHRA: lambda s: phrasesDisplay(lex, s, maxWidth),
         CMD.REGX: lambda s: wordsDisplay(lex.regex(s), maxWidth),
         CMD.LANG: lambda s: wordsDisplay(setLanguage(s), maxWidth),
         CMD.QUIT: None
@@ -154,6 +171,8 @@ def interact(lex):
     if not lex.fileName:
         del COMMANDS[CMD.HOMS]
         del COMMANDS[CMD.ANAG]
+        del COMMANDS[CMD.SUBA]
+        del COMMANDS[CMD.PHRA]
         del COMMANDS[CMD.REGX]
     # Make remaining commands visible and effective
     KS = namedtuple('KEY_SET',      # particular values of CS.KEY
@@ -169,7 +188,7 @@ def interact(lex):
     display(banner, BOLD | color(CYAN))
     while True:
         if lex.fileName:
-            nHeads, nProns, nVars = lex.stats()
+            nHeads, nProns, nVars = lex.stats()[:3]
             fileName = os.path.basename(lex.fileName)
             status(-3, fmt(_('File: {fileName} '
                          '[{nHeads:,d} /{nProns:,d} ({nVars:,d})/]')))
@@ -0,0 +1,246 @@
+# lexTest.py jcj 2026-10-18
+
+'''Regression tests for the lexicon module: run with make test, or
+python3 -m unittest lexTest'''
+
+# Standard-library imports
+import os
+import re
+import time
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from itertools import combinations_with_replacement
+from collections import Counter
+
+# project imports
+import lexicon
+from lexRegex import bufferable
+from lexCompact import CompactMap
+
+def makeWords(count):
+    '''Return count distinct lower-case words, none of them with a q'''
+    letters = 'abcdefghijklmnoprstuvwxyz'
+    words = []
+    for i in range(count):
+        word = ''
+        while True:
+            word += letters[i % len(letters)]
+            i //= len(letters)
+            if not i:
+                break
+        words.append(word + 'ing')
+    return words
+
+class LexiconTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        '''Read a lexicon of 20,000 made-up words, without snapshots'''
+        cls.words = makeWords(20000)
+        with tempfile.NamedTemporaryFile('w', suffix='.lex',
+                                         delete=False) as f:
+            f.write('\n'.join(cls.words) + '\n')
+        cls.fileName = f.name
+        cls.lex = lexicon.Lexicon({'lexicon': cls.fileName, 'cache': ''})
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(cls.fileName)
+
+    def scan(self, pattern):
+        '''Return the words matching pattern, searched for one by one'''
+        search = re.compile(pattern).search
+        return [word for word in self.lex.words if search(word)]
+
+    def testNewlineClassesNotBuffered(self):
+        '''Classes which can match a newline would make a search of the
+        buffer of all the words run on through it, taking quadratic time'''
+        for pattern in (r'a[^q]*z', r'\D*x$', r'\s', r'\W', r'(?s)a.*z',
+                        r'[\x00-\x20]'):
+            self.assertFalse(bufferable(re.compile(pattern)), pattern)
+        for pattern in (r'a.*z', r'[^\n]z', r'\w+z$'):
+            self.assertTrue(bufferable(re.compile(pattern)), pattern)
+
+    def testNewlineClassSearchTime(self):
+        '''A regex with a class matching newlines takes little longer than
+        searching the words one by one, and finds the same ones'''
+        pattern = r'\D*x$'     # matches none of the words
+        start = time.perf_counter()
+        expected = self.scan(pattern)
+        scanTime = time.perf_counter() - start
+        start = time.perf_counter()
+        found = self.lex.search(pattern)
+        searchTime = time.perf_counter() - start
+        self.assertEqual(found, expected)
+        self.assertLess(searchTime, 5 * scanTime + 0.5)
+
+    def testNegativeOffsets(self):
+        '''A negative offset or limit counts as 0, rather than reaching back
+        into the words before those with the prefix or suffix'''
+        for method, affix, matches in (
+                (self.lex.prefixed, 'ba', lambda w: w.startswith('ba')),
+                (self.lex.suffixed, 'bing', lambda w: w.endswith('bing'))):
+            expected = sorted(filter(matches, self.words))
+            self.assertTrue(expected)
+            self.assertEqual(method(affix, offset=-3), expected)
+            self.assertEqual(method(affix, 2, -3), expected[:2])
+            self.assertEqual(method(affix, -1, 1), [])
+
+# A tiny lexicon of words with pronunciations, variant forms and anagrams
+FIXTURE = ['# a tiny lexicon',
+           'beater\tB IY1 T ER0', 'berate\tB IH0 R EY1 T',
+           'rebate\tR IY1 B EY2 T', 'Bert', 'bet', 'beet\tB IY1 T',
+           'beat\tB IY1 T', 'abet', 'bee', 'tea\tT IY1', 'eat\tIY1 T',
+           'ate\tEY1 T, EH1 T', 'Eta', 'rat', 'tar', 'art', 'tare',
+           'tear\tT EH1 R, T IH1 R', 'rate\tR EY1 T', 'Tate', '\u00e9ta',
+           'Polish\tP OW1 L IH0 SH', 'polish\tP AA1 L IH0 SH', "O'Brien",
+           'a_b', 'Ab', 'ba']
+
+class FixtureTest(unittest.TestCase):
+    '''Tests on the tiny FIXTURE lexicon and a hundred made-up words,
+    comparing the lexicon with another built differently or with the
+    results of brute force'''
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.fileName = os.path.join(self.dir.name, 'tiny.lex')
+        self.lines = FIXTURE + makeWords(100)
+        self.write(self.lines, 1)
+        # the words queried, including some not in the file
+        self.words = sorted({line.split('\t')[0] for line in self.lines
+                             if not line.startswith('#')} |
+                            {'bets', 'beta', 'ghost', 'xyzzy'})
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def write(self, lines, version):
+        '''Write lines to the lexicon file, giving each version of it a
+        modification time of its own however quickly they are written'''
+        with open(self.fileName, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.utime(self.fileName, ns=(version * 10**9, version * 10**9))
+
+    def read(self, **options):
+        '''Return the lexicon file read with options'''
+        return lexicon.Lexicon(dict(options, lexicon=self.fileName))
+
+    def queries(self, lex):
+        '''Yield the results of queries of each kind for each word in the
+        file and the letters in them. Lists which hold the forms of words
+        in the order of the file are sorted, as the lexicons compared may
+        have them in the order in which they were added instead'''
+        forms = lambda results: sorted(' '.join(sorted(result.split()))
+                                       for result in results or ())
+        yield lex.stats()[:3]
+        for word in self.words:
+            yield forms(lex.contains(word))
+            yield sorted(lex.pronunciations(word) or ())
+            yield forms(lex.homophones(word))
+            yield forms(lex.anagrams(word))
+            yield lex.subanagrams(word)
+        for letter in sorted(set(''.join(self.words))):
+            yield forms(lex.prefixed(letter))
+            yield forms(lex.suffixed(letter))
+            yield sorted(lex.regex(letter + '.*e'))
+
+    def assertSameQueries(self, lex, expected):
+        '''Check that lex answers the queries as expected does'''
+        for result, wanted in zip(self.queries(lex), self.queries(expected)):
+            self.assertEqual(result, wanted)
+
+    def testSnapshotUpdate(self):
+        '''A snapshot patched with a few edited lines answers queries as
+        a lexicon read afresh from the edited file does'''
+        cache = os.path.join(self.dir.name, 'cache')
+        for icase in (False, True):
+            shutil.rmtree(cache, ignore_errors=True)
+            self.write(self.lines, 1)
+            self.read(cache=cache, icase=icase)      # saves a snapshot
+            lines = list(self.lines)
+            lines[5] = 'bets'                        # edit a word
+            lines[10] = 'tea\tT IY1, T EY1'          # and a pronunciation
+            del lines[20]                            # remove a line
+            lines.insert(3, 'Rebate')                # add a variant form
+            lines.append('beta\tB EY1 T AH0')        # and a word
+            self.write(lines, 2)
+            updated = []
+            update = lexicon.Lexicon.updateSnapshot
+            def patched(lex, *args):
+                updated.append(update(lex, *args))
+                return updated[-1]
+            with mock.patch.object(lexicon.Lexicon, 'updateSnapshot',
+                                   patched):
+                lex = self.read(cache=cache, icase=icase)
+            self.assertEqual(updated, [True])
+            self.assertSameQueries(lex, self.read(icase=icase))
+            # and the snapshot it saved loads as it stands
+            self.assertSameQueries(self.read(cache=cache, icase=icase),
+                                   self.read(icase=icase))
+
+    def testCompactLookups(self):
+        '''Compact indexes answer queries as the lists and dicts do, both
+        as read and once lines have been added and removed'''
+        for icase in (False, True):
+            compact = self.read(compact=True, icase=icase)
+            plain = self.read(icase=icase)
+            self.assertIsInstance(compact.refs, CompactMap)
+            self.assertSameQueries(compact, plain)
+            for lex in (compact, plain):
+                lex.addEntries(['bets', 'Beta\tB EY1 T AH0'])
+                lex.removeEntries([self.lines[5], self.lines[10]])
+            self.assertSameQueries(compact, plain)
+
+    def entryWords(self, lex):
+        '''Return the words of the lines of the file, each with the Counter
+        of the letters of its anagram hash'''
+        return [(word, Counter(lex.anagramHash(word)))
+                for word in (line.split('\t')[0] for line in self.lines
+                             if not line.startswith('#'))]
+
+    def testSubanagrams(self):
+        '''subanagrams finds the words spelled with letters which checking
+        every word finds, longest first and then in order'''
+        lex = self.read()
+        for letters in ('beaterat', 'Polishing', "O'Brien, at", 'abcding',
+                        'xyzzy', ''):
+            available = Counter(lex.anagramHash(letters))
+            for minLength in (1, 2, 4):
+                expected = sorted((-sum(counts.values()), word)
+                                  for word, counts in self.entryWords(lex)
+                                  if sum(counts.values()) >= minLength
+                                  and not counts - available)
+                self.assertEqual(lex.subanagrams(letters, minLength),
+                                 [word for length, word in expected])
+
+    def testPhraseAnagrams(self):
+        '''phraseAnagrams finds each set of words whose letters together
+        are those given which trying every combination of words finds,
+        once, with its longest words first'''
+        lex = self.read()
+        for letters, maxWords in (('beaterat', 2), ('beaterat', 3),
+                                  ('tea rate bet', 3), ('aingbing', 3),
+                                  ('Polish tar', 1), ('xyzzy', 3)):
+            available = Counter(lex.anagramHash(letters))
+            usable = [(word, counts) for word, counts in self.entryWords(lex)
+                      if sum(counts.values()) >= lexicon.MIN_PHRASE_WORD
+                      and not counts - available]
+            expected = set()
+            for count in range(1, maxWords + 1):
+                for words in combinations_with_replacement(usable, count):
+                    if sum((counts for word, counts in words),
+                           Counter()) == available:
+                        expected.add(tuple(sorted(word for word, _ in words)))
+            phrases = [phrase.split(' ')
+                       for phrase in lex.phraseAnagrams(letters, maxWords)]
+            self.assertEqual(len(phrases), len(expected))
+            self.assertEqual({tuple(sorted(words)) for words in phrases},
+                             expected)
+            for words in phrases:
+                lengths = [len(lex.anagramHash(word)) for word in words]
+                self.assertEqual(lengths, sorted(lengths, reverse=True))
+
+if __name__ == '__main__':
+    unittest.main()
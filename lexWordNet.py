@@ -0,0 +1,361 @@
+# lexWordNet.py jcj 2026-10-18
+
+'''Sources of the WordNet information used by Lexicon: either NLTK's
+corpus reader, imported only when first needed, or a store compiled from
+it once, which answers the same questions from an indexed SQLite file
+without NLTK at all. Compile a store with
+    python3 lexWordNet.py STORE [LANG ...]
+where each LANG is an ISO 639-3 code; English is always included.'''
+
+# Standard-library imports
+import os
+import sys
+import json
+import threading
+import importlib.util
+from functools import lru_cache
+from collections import namedtuple, OrderedDict
+
+from my.constants import StrConsts
+
+__all__ = ['WordNetInfo', 'WNG', 'WNE', 'WNL', 'WNKINDS', 'WNCATS',
+           'WNNormalized', 'NLTKWordNet', 'WordNetStore', 'openWordNet',
+           'compileWordNet']
+
+WordNetInfo = namedtuple('WordNetInfo', 'base, pos, number, info')
+WNPARAMS = namedtuple('WNPARAMS', 'GROUP, EXTENT, LEVEL, OUTTYPE')
+WNG = StrConsts('defs, rels')         # group to which relation belongs
+WNE = StrConsts('head, syns')         # extent of lemmas returned
+WNL = StrConsts('syn, lem, sub, oth') # level from which relation is drawn
+WNKINDS = OrderedDict([
+    ('definition',          WNPARAMS(WNG.DEFS, WNE.HEAD, WNL.SYN, list)),
+    ('examples',            WNPARAMS(WNG.DEFS, WNE.HEAD, WNL.SYN, list)),
+    ('frame_strings',       WNPARAMS(WNG.DEFS, WNE.HEAD, WNL.LEM, list)),
+    ('synonyms',            WNPARAMS(WNG.RELS, WNE.SYNS, WNL.OTH, str)),
+    ('antonyms',            WNPARAMS(WNG.RELS, WNE.SYNS, WNL.LEM, str)),
+    ('pertainyms',          WNPARAMS(WNG.RELS, WNE.SYNS, WNL.LEM, str)),
+    ('hypernyms',           WNPARAMS(WNG.RELS, WNE.SYNS, WNL.SUB, str)),
+    ('hyponyms',            WNPARAMS(WNG.RELS, WNE.SYNS, WNL.SUB, str)),
+    ('part_meronyms',       WNPARAMS(WNG.RELS, WNE.SYNS, WNL.SUB, str)),
+    ('part_holonyms',       WNPARAMS(WNG.RELS, WNE.SYNS, WNL.SUB, str)),
+    ('substance_meronyms',  WNPARAMS(WNG.RELS, WNE.SYNS, WNL.SUB, str)),
+    ('substance_holonyms',  WNPARAMS(WNG.RELS, WNE.SYNS, WNL.SUB, str)),
+    ('entailments',         WNPARAMS(WNG.RELS, WNE.SYNS, WNL.SUB, str)),
+    ('derivationally_related_forms',
+                            WNPARAMS(WNG.DEFS, WNE.HEAD, WNL.LEM, str)),
+    ])
+WNCATS = { 'n': 'N', 'v': 'V', 'a': 'Adj', 's': 'Sat', 'r': 'Adv' }
+
+LEMMA_CACHE_SIZE = 1 << 16 # How many lemmatizations are remembered?
+
+def WNNormalized(word):
+    '''Return a WordNet-normalized version of word: all lower-case and
+    no apostrophes'''
+    return word.lower().replace("'", '')
+
+def levelKinds(kinds):
+    '''Return a dict from each level to the kinds drawn from it'''
+    return {level: [kind for kind in kinds if WNKINDS[kind].LEVEL == level]
+            for level in (WNL.SYN, WNL.LEM, WNL.SUB)}
+
+# Each source of WordNet information has the methods
+#     langs()                     the languages it has lemmas for
+#     lemmatize(word, cat)        the shortest lemma of word in category cat
+#     senses(word, lang, kinds)   the senses of a WordNet-normalized word
+#     warmUp(lang)                load what is needed to answer about lang
+# where senses returns, for each synset containing word, a tuple of
+#     the parts of the synset's name (base, category, number),
+#     a list of (kind, value) pairs for the synset itself,
+#     a list of (lemma name, [(kind, names)]) pairs for its lemmas, and
+#     a list of (kind, lemma names) pairs for the synsets related to it
+
+class NLTKWordNet:
+    '''WordNet as NLTK's corpus reader has it. NLTK is slow to import, so
+    that is put off until the first question'''
+
+    def __init__(self):
+        self.wn = None
+        self.lock = threading.Lock()
+        self.warmed = set()    # languages whose lemmas have been loaded
+        self.lemmatize = lru_cache(maxsize=LEMMA_CACHE_SIZE)(self.lemmatize)
+
+    def load(self):
+        '''Import NLTK's WordNet reader and lemmatizer if not yet done'''
+        if self.wn is None:
+            with self.lock:
+                if self.wn is None:
+                    from nltk.corpus import wordnet
+                    from nltk.stem import WordNetLemmatizer
+                    self.wnl = WordNetLemmatizer()
+                    self.wn = wordnet
+        return self.wn
+
+    def langs(self):
+        return self.load().langs()
+
+    def warmUp(self, lang):
+        # The corpus reader loads its data files, and each language's
+        # lemmas, lazily and without locking, so do it all here at once
+        wn = self.load()
+        with self.lock:
+            if lang not in self.warmed:
+                wn.synsets('entity', lang=lang)
+                if lang != 'eng':
+                    wn.synsets('entity')
+                self.wnl.lemmatize('entities')
+                self.warmed.add(lang)
+
+    def lemmatize(self, word, cat):
+        self.load()
+        return self.wnl.lemmatize(word, cat)
+
+    def senses(self, word, lang, kinds):
+        wn = self.load()
+        levels = levelKinds(kinds)
+        senses = []
+        for synset in wn.synsets(word, lang=lang):
+            synInfo = [(kind, getattr(synset, kind)())
+                       for kind in levels[WNL.SYN]]
+            lemmas = []
+            for lemma in synset.lemmas(lang=lang):
+                lemmas.append((lemma.name(), [(kind, lemmaNames(lemma, kind))
+                                              for kind in levels[WNL.LEM]]))
+            subs = []
+            for kind in levels[WNL.SUB]:
+                subs.append((kind, [lemma.name()
+                                    for item in getattr(synset, kind)()
+                                    for lemma in item.lemmas(lang=lang)]))
+            senses.append(tuple(synset.name().split('.')) +
+                          (synInfo, lemmas, subs))
+        return senses
+
+def lemmaNames(lemma, kind):
+    '''Return the names of the lemmas, or the strings, related to lemma'''
+    names = []
+    for nym in getattr(lemma, kind)():
+        try:
+            names.append(nym.name())
+        except AttributeError:
+            names.append(nym)
+    return names
+
+# Compiled stores have the same layout as long as this is unchanged
+STORE_VERSION = 1
+
+SCHEMA = '''
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE synsets (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+CREATE TABLE synsetValues (synset INTEGER, kind TEXT, value TEXT,
+    PRIMARY KEY (synset, kind)) WITHOUT ROWID;
+CREATE TABLE synsetLinks (synset INTEGER, kind TEXT, rank INTEGER,
+    target INTEGER, PRIMARY KEY (synset, kind, rank)) WITHOUT ROWID;
+CREATE TABLE lemmas (synset INTEGER, lang TEXT, rank INTEGER, name TEXT,
+    PRIMARY KEY (synset, lang, rank)) WITHOUT ROWID;
+CREATE TABLE lemmaValues (synset INTEGER, lang TEXT, rank INTEGER,
+    kind TEXT, value TEXT,
+    PRIMARY KEY (synset, lang, rank, kind)) WITHOUT ROWID;
+CREATE TABLE senses (lang TEXT, form TEXT, pos TEXT, rank INTEGER,
+    synset INTEGER, PRIMARY KEY (lang, form, pos, rank)) WITHOUT ROWID;
+CREATE TABLE exceptions (pos TEXT, form TEXT, rank INTEGER, base TEXT,
+    PRIMARY KEY (pos, form, rank)) WITHOUT ROWID;
+'''
+
+# English senses are looked up as NLTK does: in each of these categories
+# in turn, for each form of the word found by morphy
+POS_LIST = ('n', 'v', 'a', 'r')
+# morphy's rules for taking the inflections off a word
+SUBSTITUTIONS = {
+    'n': [('s', ''), ('ses', 's'), ('ves', 'f'), ('xes', 'x'), ('zes', 'z'),
+          ('ches', 'ch'), ('shes', 'sh'), ('men', 'man'), ('ies', 'y')],
+    'v': [('s', ''), ('ies', 'y'), ('es', 'e'), ('es', ''), ('ed', 'e'),
+          ('ed', ''), ('ing', 'e'), ('ing', '')],
+    'a': [('er', ''), ('est', ''), ('er', 'e'), ('est', 'e')],
+    'r': [],
+    }
+SUBSTITUTIONS['s'] = SUBSTITUTIONS['a']
+
+class WordNetStore:
+    '''WordNet as compiled by compileWordNet into an SQLite file, which is
+    opened read-only and shared by all threads'''
+
+    def __init__(self, fileName):
+        import sqlite3   # only now, as most runs need no store
+        uri = 'file:{}?mode=ro'.format(os.path.abspath(fileName))
+        self.db = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self.lock = threading.Lock()
+        meta = dict(self.query('SELECT key, value FROM meta'))
+        if meta.get('version') != str(STORE_VERSION):
+            self.db.close()
+            raise sqlite3.DatabaseError('not a current WordNet store')
+        self.languages = json.loads(meta['languages'])
+        self.lemmatize = lru_cache(maxsize=LEMMA_CACHE_SIZE)(self.lemmatize)
+
+    def query(self, sql, *params):
+        '''Return a list of the rows answering sql'''
+        with self.lock:
+            return self.db.execute(sql, params).fetchall()
+
+    def langs(self):
+        return list(self.languages)
+
+    def warmUp(self, lang):
+        # Page in the indexes; SQLite reads only what it needs anyway
+        self.senses('entity', lang, tuple(WNKINDS))
+
+    def lemmatize(self, word, cat):
+        lemmas = self.morphy(word, cat)
+        return min(lemmas, key=len) if lemmas else word
+
+    def morphy(self, form, pos):
+        '''Return the forms of form in category pos which are WordNet
+        lemmas, as NLTK's _morphy does'''
+        bases = [base for (base,) in self.query(
+                 'SELECT base FROM exceptions WHERE pos = ? AND form = ? '
+                 'ORDER BY rank', pos, form)]
+        if not bases:
+            bases = [form[:-len(old)] + new
+                     for old, new in SUBSTITUTIONS[pos] if form.endswith(old)]
+        results = []
+        for candidate in [form] + bases:
+            if candidate not in results and self.query(
+                    'SELECT 1 FROM senses WHERE lang = ? AND form = ? '
+                    'AND pos = ? LIMIT 1', 'eng', candidate, pos):
+                results.append(candidate)
+        return results
+
+    def synsets(self, word, lang):
+        '''Return the ids of the synsets containing word in lang'''
+        word = word.lower()
+        if lang != 'eng':
+            return [synset for (synset,) in self.query(
+                    'SELECT synset FROM senses WHERE lang = ? AND form = ? '
+                    'ORDER BY rank', lang, word)]
+        return [synset for pos in POS_LIST
+                for form in self.morphy(word, pos)
+                for (synset,) in self.query(
+                    'SELECT synset FROM senses WHERE lang = ? AND form = ? '
+                    'AND pos = ? ORDER BY rank', lang, form, pos)]
+
+    def lemmaNames(self, synset, lang):
+        '''Return the names of the lemmas of synset in lang'''
+        return [name for (name,) in self.query(
+                'SELECT name FROM lemmas WHERE synset = ? AND lang = ? '
+                'ORDER BY rank', synset, lang)]
+
+    def senses(self, word, lang, kinds):
+        levels = levelKinds(kinds)
+        senses = []
+        for synset in self.synsets(word, lang):
+            (name,), = self.query('SELECT name FROM synsets WHERE id = ?',
+                                  synset)
+            values = dict(self.query('SELECT kind, value FROM synsetValues '
+                                     'WHERE synset = ?', synset))
+            synInfo = [(kind, json.loads(values[kind]))
+                       for kind in levels[WNL.SYN]]
+            lemmaValues = {(rank, kind): json.loads(value)
+                           for rank, kind, value in self.query(
+                               'SELECT rank, kind, value FROM lemmaValues '
+                               'WHERE synset = ? AND lang = ?', synset, lang)}
+            lemmas = []
+            for rank, lemma in enumerate(self.lemmaNames(synset, lang)):
+                lemmas.append((lemma, [(kind, lemmaValues.get((rank, kind), []))
+                                       for kind in levels[WNL.LEM]]))
+            subs = []
+            for kind in levels[WNL.SUB]:
+                subs.append((kind, [lemma for (target,) in self.query(
+                                        'SELECT target FROM synsetLinks '
+                                        'WHERE synset = ? AND kind = ? '
+                                        'ORDER BY rank', synset, kind)
+                                    for lemma in self.lemmaNames(target, lang)]))
+            senses.append(tuple(name.split('.')) + (synInfo, lemmas, subs))
+        return senses
+
+sources = {}   # store file name (or '' for NLTK) -> source already opened
+
+def openWordNet(storeName=''):
+    '''Return the compiled store storeName if it exists and is usable,
+    otherwise NLTK's WordNet if NLTK is installed, otherwise None. Sources
+    are opened only once, so that they and their memos can be shared'''
+    if storeName and os.path.exists(storeName):
+        if storeName not in sources:
+            import sqlite3
+            try:
+                sources[storeName] = WordNetStore(storeName)
+            except sqlite3.Error:
+                sources[storeName] = None
+        if sources[storeName]:
+            return sources[storeName]
+    if '' not in sources:
+        sources[''] = (NLTKWordNet() if importlib.util.find_spec('nltk')
+                       else None)
+    return sources['']
+
+def compileWordNet(fileName, languages=()):
+    '''Compile all that Lexicon needs to know from NLTK's WordNet, in
+    English and the other languages, into a new store fileName'''
+    nltk = openWordNet()
+    if not isinstance(nltk, NLTKWordNet):
+        raise ImportError('NLTK is needed to compile WordNet')
+    wn = nltk.load()
+    languages = ['eng'] + [lang for lang in languages if lang != 'eng']
+    import sqlite3
+    tmpName = fileName + '.tmp'
+    if os.path.exists(tmpName):
+        os.remove(tmpName)
+    db = sqlite3.connect(tmpName)
+    db.executescript(SCHEMA)
+    levels = levelKinds(WNKINDS)
+    synsets = list(wn.all_synsets())
+    ids = {synset.name(): i for i, synset in enumerate(synsets)}
+    for i, synset in enumerate(synsets):
+        db.execute('INSERT INTO synsets VALUES (?, ?)', (i, synset.name()))
+        for kind in levels[WNL.SYN]:
+            db.execute('INSERT INTO synsetValues VALUES (?, ?, ?)',
+                       (i, kind, json.dumps(getattr(synset, kind)())))
+        for kind in levels[WNL.SUB]:
+            db.executemany('INSERT INTO synsetLinks VALUES (?, ?, ?, ?)',
+                           [(i, kind, rank, ids[item.name()]) for rank, item
+                            in enumerate(getattr(synset, kind)())])
+        for lang in languages:
+            for rank, lemma in enumerate(synset.lemmas(lang=lang)):
+                db.execute('INSERT INTO lemmas VALUES (?, ?, ?, ?)',
+                           (i, lang, rank, lemma.name()))
+                for kind in levels[WNL.LEM]:
+                    names = lemmaNames(lemma, kind)
+                    if names:
+                        db.execute('INSERT INTO lemmaValues '
+                                   'VALUES (?, ?, ?, ?, ?)',
+                                   (i, lang, rank, kind, json.dumps(names)))
+    # English words are found through morphy, which needs the exceptions
+    # and the lemma index of the corpus reader, not otherwise published
+    for form, offsets in wn._lemma_pos_offset_map.items():
+        for pos, offsetList in offsets.items():
+            db.executemany('INSERT INTO senses VALUES (?, ?, ?, ?, ?)',
+                [('eng', form, pos, rank,
+                  ids[wn.synset_from_pos_and_offset(pos, offset).name()])
+                 for rank, offset in enumerate(offsetList)])
+    for pos, exceptions in wn._exception_map.items():
+        for form, bases in exceptions.items():
+            db.executemany('INSERT INTO exceptions VALUES (?, ?, ?, ?)',
+                           [(pos, form, rank, base)
+                            for rank, base in enumerate(bases)])
+    # Words in other languages are simply looked up in lower case
+    for lang in languages[1:]:
+        forms = {name.lower() for (name,) in db.execute(
+                 'SELECT name FROM lemmas WHERE lang = ?', (lang,))}
+        for form in forms:
+            db.executemany('INSERT INTO senses VALUES (?, ?, ?, ?, ?)',
+                           [(lang, form, '', rank, ids[synset.name()])
+                            for rank, synset
+                            in enumerate(wn.synsets(form, lang=lang))])
+    db.executemany('INSERT INTO meta VALUES (?, ?)',
+                   [('version', str(STORE_VERSION)),
+                    ('languages', json.dumps(languages))])
+    db.commit()
+    db.close()
+    os.replace(tmpName, fileName)
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        sys.exit('Usage: {} STORE [LANG ...]'.format(sys.argv[0]))
+    compileWordNet(sys.argv[1], sys.argv[2:])
@@ -1,4 +1,4 @@
-# lexicon.py jcj 2019-02-20, 2020-01-23, 2020-02-07, 2020-05-10
+# lexicon.py jcj 2019-02-20, 2020-01-23, 2020-02-07, 2020-05-10, 2026-10-18
 
 '''A class to implement a lexicon with methods for lookup of
 definitions with examples, synonyms and other related words,
@@ -6,148 +6,650 @@ pronunciations, homophones, anagrams, and regular expressions,
 using a user-supplied lexicon and/or the facilities of WordNet'''
 
 # Standard-library imports
+import os
 import sys
 import re
 import bisect
+import string
+import heapq
+import locale
+import mmap
+import tempfile
+import threading
+import time
 import unicodedata as ud
-from collections import namedtuple, defaultdict, OrderedDict
+from array import array
+from functools import partial
+from itertools import (compress, groupby, product,
+                       combinations_with_replacement)
+from collections import namedtuple, defaultdict, OrderedDict, Counter
 
-from my.constants import StrConsts
+# Project imports
+from lexCache import LRUCache
+from lexCompact import StringTable, CompactMap, compactMap
+from lexRefs import RefMap
+from lexSnapshot import snapshotKey, snapshotPath, saveSnapshot, loadSnapshot
+from lexRegex import (requiredLiterals, ngrams, lineStarts, bufferable,
+                      bufferSearch)
+from lexWordNet import (WordNetInfo, WNG, WNE, WNKINDS, WNCATS, WNNormalized,
+                        openWordNet)
 
-# WordNet-related stuff (may be unavailable)
-WORDNET = False
-try:
-    from nltk.corpus import wordnet as wn
-    from nltk.stem import WordNetLemmatizer
-    WORDNET = True
-except ImportError:
-    pass
-
-if WORDNET:
-    wnl = WordNetLemmatizer()
-    WordNetInfo = namedtuple('WordNetInfo', 'base, pos, number, info')
-    WNPARAMS = namedtuple('WNPARAMS', 'GROUP, EXTENT, LEVEL, OUTTYPE')
-    WNG = StrConsts('defs, rels')         # group to which relation belongs
-    WNE = StrConsts('head, syns')         # extent of lemmas returned
-    WNL = StrConsts('syn, lem, sub, oth') # level from which relation is drawn
-    WNKINDS = OrderedDict([
-        ('definition',          WNPARAMS(WNG.DEFS, WNE.HEAD, WNL.SYN, list)),
-        ('examples',            WNPARAMS(WNG.DEFS, WNE.HEAD, WNL.SYN, list)),
-        ('frame_strings',       WNPARAMS(WNG.DEFS, WNE.HEAD, WNL.LEM, list)),
-        ('synonyms',            WNPARAMS(WNG.RELS, WNE.SYNS, WNL.OTH, str)),
-        ('antonyms',            WNPARAMS(WNG.RELS, WNE.SYNS, WNL.LEM, str)),
-        ('pertainyms',          WNPARAMS(WNG.RELS, WNE.SYNS, WNL.LEM, str)),
-        ('hypernyms',           WNPARAMS(WNG.RELS, WNE.SYNS, WNL.SUB, str)),
-        ('hyponyms',            WNPARAMS(WNG.RELS, WNE.SYNS, WNL.SUB, str)),
-        ('part_meronyms',       WNPARAMS(WNG.RELS, WNE.SYNS, WNL.SUB, str)),
-        ('part_holonyms',       WNPARAMS(WNG.RELS, WNE.SYNS, WNL.SUB, str)),
-        ('substance_meronyms',  WNPARAMS(WNG.RELS, WNE.SYNS, WNL.SUB, str)),
-        ('substance_holonyms',  WNPARAMS(WNG.RELS, WNE.SYNS, WNL.SUB, str)),
-        ('entailments',         WNPARAMS(WNG.RELS, WNE.SYNS, WNL.SUB, str)),
-        ('derivationally_related_forms',
-                                WNPARAMS(WNG.DEFS, WNE.HEAD, WNL.LEM, str)),
-        ])
-    WNCATS = { 'n': 'N', 'v': 'V', 'a': 'Adj', 's': 'Sat', 'r': 'Adv' }
+# Constants for remembering WordNet lookups
+WN_CACHE_BYTES = 16 << 20  # How much memory may remembered senses take up?
 
 # Constants for busyWait callable
-PHASES = 5     # How many times is each entry processed?
-INTERVAL = 5   # How often in % is progress notified?
+EAGER_SHARE = 40  # How much of the progress in % is building lazy indexes?
+INTERVAL = 5      # How often in % is progress notified?
 READING, NORMALIZING, SORTING, HASHING, DONE = 0, 1, 2, 3, 4   # The phases
 
-__all__ = ['Lexicon', 'LexiconError']
+# Constants for reading the lexicon file
+CHUNK_SIZE = 1 << 18      # How many characters are read at once?
+PARALLEL_MIN = 1 << 20    # How big in bytes must a file be to read in parallel?
+SHARDS_PER_JOB = 4        # How many byte ranges is each process given?
+PARALLEL_WORDS = 100000   # How many words must there be to hash in parallel?
+
+# Constants for parallel regex searches
+PARALLEL_SEARCH = 100000  # How many words must there be to search in parallel?
+SHARDS_PER_WORKER = 4     # How many runs of words is each process given?
+
+# Constants for sub-anagram and phrase-anagram queries
+MIN_SUBANAGRAM = 2     # How many letters must a sub-anagram have by default?
+MIN_PHRASE_WORD = 3    # And each word of a phrase anagram?
+MAX_PHRASE_WORDS = 3   # How many words may a phrase anagram have by default?
+MAX_PHRASES = 1000     # How many phrase anagrams are found by default?
+PHRASE_SECONDS = 10    # For how long are they looked for by default?
+
+# Constants for caching query results
+CACHE_BYTES = 64 << 20    # How much memory may cached results take up?
+
+# Constants for index snapshots
+INDEX_VERSION = 5   # Change whenever the layout of the indexes changes
+SECTIONS = ('words', 'refs', 'anags', 'prons', 'spells', 'trigrams')
+
+# Constants for incremental updates
+PATCHED = ('words', 'anags', 'prons')   # indexes patched rather than rebuilt
+DROPPED = ('trigrams', 'bigrams', 'wordBuffer', 'wordStarts',  # and those
+           'anagKeys')
+                                        # rebuilt when next needed
+MAX_CHANGE = 0.1    # How much of a file may change for a stale snapshot
+                    # to be brought up to date rather than ignored?
+INSORT_MAX = 1000   # How many new words are inserted one by one rather
+                    # than merged?
+
+__all__ = ['Lexicon', 'LexiconError', 'LexiconStats']
+
+# What Lexicon.stats returns: counts of lines, pronunciations and variants
+# in the lexicon file, and of cached query results used and not available
+LexiconStats = namedtuple('LexiconStats',
+                          'lines, prons, variants, hits, misses')
+
+class DiacriticFilter(dict):
+    '''A translate table which deletes combining characters. Rather than
+    testing all of Unicode in advance, each code point is tested the first
+    time it is seen and the result remembered, so the table stays small.
+    It is always true, even before anything has been looked up'''
+
+    def __missing__(self, code):
+        self[code] = result = None if ud.combining(chr(code)) else code
+        return result
+
+    def __bool__(self):
+        return True
+
+DIACRITICS = DiacriticFilter()   # shared by all lexicons that ignore them
+
+# For ASCII words, casefold is lower and \W is anything but a letter, digit
+# or _, so anagram hashing needs only one bytes.translate, which these
+# tables do for a whole batch of newline-separated words at once
+ASCII_LOWER = bytes.maketrans(string.ascii_uppercase.encode(),
+                              string.ascii_lowercase.encode())
+ASCII_NONWORD = bytes(code for code in range(128)
+                      if not chr(code).isalnum() and chr(code) != '\n')
 
 class LexiconError(Exception):
     pass
 
 class Lexicon:
 
+    # Indexes built only when first needed, and the methods which build them
+    LAZY_INDEXES = { 'words': 'buildWords', 'anags': 'buildAnags',
+                     'prons': 'buildProns', 'spells': 'buildProns',
+                     'reversedWords': 'buildReversedWords',
+                     'trigrams': 'buildTrigrams',
+                     'bigrams': 'buildBigrams',
+                     'wordBuffer': 'buildWordBuffer',
+                     'wordStarts': 'buildWordBuffer',
+                     'anagKeys': 'buildAnagKeys' }
+
     def __init__(self, options=None, busyWait=None):
         '''Initialize an object representing a lexicon from a disk file'''
         if not options: options = {}
         self.fileName = options.get('lexicon', '')
         self.caseBlind = options.get('icase')
-        self.diacFilter = {}
-        if options.get('idiac'):
-            self.diacFilter = dict.fromkeys(c for c in range(sys.maxunicode)
-                                            if ud.combining(chr(c)))
-        self.language = options.get('language', 'eng') if WORDNET else ''
-        self.words = []                  # list of sorted, normalized words
-        self.refs = defaultdict(list)    # dict from normalized words
+        self.diacFilter = DIACRITICS if options.get('idiac') else {}
+        self.wordnet = openWordNet(options.get('wordnet', ''))
+        self.language = options.get('language', 'eng') if self.wordnet else ''
+        self.refs = RefMap()             # map from normalized words
                                          # to lists of reference forms
                                          # eg POLISH -> [Polish, polish]
-        self.anags = defaultdict(list)   # dict from normalized anagrams
-                                         # to lists of anagrammatic forms
-                                         # eg abeert -> [beater, berate, rebate]
-        self.prons = defaultdict(list)   # spelling -> pronunciations
-        self.spells = defaultdict(list)  # pronunciation -> spellings
+        # The following are built by the methods in LAZY_INDEXES:
+        # self.words                     # list of sorted, normalized words
+        # self.reversedWords             # the same, reversed and re-sorted
+        # self.trigrams                  # trigram -> positions in self.words
+        #                                # of the words containing it
+        # self.bigrams                   # the same for pairs of characters
+        # self.wordBuffer                # self.words joined by newlines
+        # self.wordStarts                # offset of each word in wordBuffer
+        # self.anags                     # dict from normalized anagrams
+        #                                # to lists of anagrammatic forms
+        #                                # eg abeert -> [beater, berate, rebate]
+        # self.anagKeys                  # the keys of self.anags, sorted
+        # self.prons                     # spelling -> pronunciations
+        # self.spells                    # pronunciation -> spellings
+        self.pronLines = []              # (normal, word, pronunciations)
+                                         # awaiting self.buildProns
+        self.anagWords = []              # words in the order of their
+                                         # lines, awaiting self.buildAnags
         self.numLines = self.numProns = self.numVars = 0
+        self.cacheDir = options.get('cache', '')   # where snapshots are kept
+        self.snapshot = None                       # and the one in use
+        self.jobs = options.get('jobs', 1)         # processes used to build
+                                                   # and to search
+        self.compact = options.get('compact')      # keep compact indexes?
+        self.timeout = options.get('timeout') or None  # seconds per search
+        self.searchPool = None                     # forked searchers
+        self.lock = threading.RLock()              # guards the lazy indexes
+        self.cache = LRUCache(CACHE_BYTES)         # recent query results
+        self.wnCache = LRUCache(WN_CACHE_BYTES)    # recent WordNet senses
+        self.warmup = options.get('warmup')        # load WordNet early?
+        self.warm = threading.Event()              # set once it is loaded
+        self.warm.set()
+        if self.wordnet and self.warmup:           # while the lexicon is
+            self.startWarmUp()                     # being read
         if self.fileName:
             self.readLexicon(self.fileName, busyWait)
 
+    def __getattr__(self, name):
+        '''Build one of the LAZY_INDEXES the first time it is asked for.
+        This is only called when name is not yet an attribute, so later
+        lookups go straight to the index'''
+        builder = self.LAZY_INDEXES.get(name)
+        if builder is None:
+            raise AttributeError(name)
+        with self.lock:
+            if name not in self.__dict__:   # not built by another thread
+                getattr(self, builder)()
+        return self.__dict__[name]
+
     def readLexicon(self, fileName, busyWait):
         '''Read in a lexicon file and initialize various structures'''
         if not busyWait:
             busyWait = lambda phase, percent: None
+        self.cache.clear()
         try:
             f = open(self.fileName)
         except Exception as err:
             raise LexiconError(err)
         busyWait(READING, 0)
-        # Read in a list of lines, without showing any progress.
-        # But then use the number of words read in to time progress updates
-        lines = [ line.rstrip('\n') for line in f.readlines()
-                                    if not line.startswith('#') ]
-        self.numLines = len(lines)
-        pcPerLine = 100 / (self.numLines * PHASES)   # NB result is a real
-        pcDone = pcPerLine * self.numLines   # for the read itself
-        # build dict of normalized forms in self.refs
-        # and pronunciation-related dictionaries in self.prons and self.spells
-        busyWait(NORMALIZING, int(pcDone))
-        # we need the unPythonic indexed loop because we change line
-        for i in range(len(lines)):
-            line = lines[i]
-            pcDone += pcPerLine
-            if pcDone % INTERVAL < pcPerLine:
-                busyWait(NORMALIZING, int(pcDone))
-            tabpos = line.find('\t')
-            if tabpos < 0:
-                tabpos = len(line)
-            normal = self.normalized(line[:tabpos], self.caseBlind,
-                                     self.diacFilter)
-            variants = line[tabpos+1:]
-            line = line[:tabpos]
-            # store pronunciations
-            if variants:
-                self.numProns += 1
-                variants = variants.split(', ')
-                self.numVars += len(variants)
-                for variant in variants:
-                    if variant not in self.prons[normal]:
-                        self.prons[normal].append(variant)
-                    self.spells[variant].append(line)
-            lines[i] = line
-            self.refs[normal].append(line)
-        # build sorted list of normalized word forms for lookup
-        busyWait(SORTING, int(pcDone))
-        self.words = sorted(self.refs)   # includes only the keys
-        pcDone += pcPerLine * self.numLines
-        # build a separate dictionary of normalized anagram forms
-        busyWait(HASHING, int(pcDone))
-        for line in lines: 
-            pcDone += pcPerLine
-            if pcDone % INTERVAL < pcPerLine:
-                busyWait(HASHING, int(pcDone))
-            hash = self.anagramHash(line)
-            self.anags[hash].append(line)
-        busyWait(DONE, 100)
+        # Use the indexes saved last time if the file hasn't changed since
+        if self.cacheDir:
+            key = snapshotKey(self.fileName, INDEX_VERSION,
+                              bool(self.caseBlind), bool(self.diacFilter),
+                              bool(self.compact))
+            snapshotName = snapshotPath(self.cacheDir, key)
+            if self.loadSnapshot(snapshotName, key):
+                f.close()
+                busyWait(DONE, 100)
+                return
+            # or those saved for an earlier state of it, brought up to date
+            if self.updateSnapshot(snapshotName, key, f, busyWait):
+                f.close()
+                busyWait(DONE, 100)
+                return
+        # A snapshot must contain every index, so build them all now, and
+        # the entry lines, copied to a spool file as they are read
+        pcShare = 100 - EAGER_SHARE if self.cacheDir or self.compact else 100
+        lines = self.lineSpool() if self.cacheDir else None
+        busyWait(NORMALIZING, 0)
+        size = os.fstat(f.fileno()).st_size
+        if self.jobs > 1 and size >= PARALLEL_MIN:
+            self.readShards(size, busyWait, pcShare, lines)
+        else:
+            self.readChunks(f, size, busyWait, pcShare, lines)
         if f:
             f.close()
+        if self.cacheDir:
+            busyWait(SORTING, pcShare)
+            self.buildIndexes('words')
+            busyWait(HASHING, pcShare + EAGER_SHARE // 4)
+            self.buildIndexes('anags', 'prons', 'trigrams')
+            if self.compact:
+                self.compactIndexes()
+            if lines:
+                self.saveSnapshot(snapshotName, key, lines)
+                lines.close()
+        elif self.compact:
+            busyWait(SORTING, pcShare)
+            self.compactIndexes()
+        busyWait(DONE, 100)
+
+    def readChunks(self, f, size, busyWait, pcShare, lines=None):
+        '''Stream the file in chunks, indexing each line in a single pass
+        so that memory use is bounded by the indexes themselves, and
+        copying the entry lines to the spool file lines if given.
+        Progress is measured by the number of bytes consumed so far'''
+        size = size or 1
+        nextReport = 0
+        for entries in readEntries(f):
+            for line in entries:
+                self.addEntry(*self.parseLine(line))
+            if lines and entries:
+                spoolLines(lines, '\n'.join(entries))
+            pcDone = pcShare * f.buffer.tell() // size
+            if pcDone >= nextReport:
+                busyWait(NORMALIZING, min(pcDone, pcShare))
+                nextReport = pcDone + INTERVAL
+
+    def readShards(self, size, busyWait, pcShare, lines=None):
+        '''Split the file into byte ranges which a pool of worker processes
+        parse in parallel. The parsed shards come back in file order, so the
+        indexes, and the entry lines copied to the spool file lines if
+        given, are the same as those built by readChunks'''
+        count = self.jobs * SHARDS_PER_JOB
+        with open(self.fileName, 'rb') as f:
+            bounds = [0]
+            for i in range(1, count):
+                f.seek(max(size * i // count, bounds[-1]))
+                f.readline()     # move to the start of the next line
+                if bounds[-1] < f.tell() < size:
+                    bounds.append(f.tell())
+            bounds.append(size)
+        encoding = locale.getpreferredencoding(False)   # as used by open()
+        shards = [(self.fileName, start, end, encoding, lines is not None)
+                  for start, end in zip(bounds, bounds[1:])]
+        done = 0
+        with self.pool() as pool:
+            for (start, end), columns in zip(zip(bounds, bounds[1:]),
+                                             pool.imap(parseShard, shards)):
+                if columns:
+                    words, normals, variants = (
+                        column.split('\n') if column is not None else None
+                        for column in columns[:3])
+                    for entry in zip(words, normals or words, variants):
+                        self.addEntry(*entry)
+                    if lines:
+                        spoolLines(lines, columns[3])
+                done += end - start
+                busyWait(NORMALIZING, pcShare * done // size)
+
+    def pool(self):
+        '''Return a pool of self.jobs worker processes, each with its own
+        empty Lexicon with the same options as this one'''
+        import multiprocessing   # only now, as it is slow to import
+        return multiprocessing.Pool(self.jobs, initializer=initShardLexicon,
+                                    initargs=(self.caseBlind,
+                                              bool(self.diacFilter)))
+
+    def parseLine(self, line):
+        '''Split one line of the lexicon file into a word and its possibly
+        empty comma-separated pronunciations, and return these together
+        with the normalized form of the word'''
+        word, tab, variants = line.partition('\t')
+        return (word, self.normalized(word, self.caseBlind, self.diacFilter),
+                variants)
+
+    def addEntry(self, word, normal, variants):
+        '''Add one parsed line of the lexicon file to the indexes'''
+        self.numLines += 1
+        # pronunciations are only counted now, and stored by buildProns
+        if variants:
+            self.numProns += 1
+            self.numVars += variants.count(', ') + 1
+            self.pronLines.append((normal, word, variants))
+        # anagram classes list their words in the order of the file, so
+        # that order is kept until they are built, sharing the strings
+        # kept in self.refs
+        self.anagWords.append(normal if word == normal else word)
+        self.refs.add(normal, word)
+
+    def addEntries(self, lines):
+        '''Add lines in the format of the lexicon file to the lexicon,
+        patching the indexes already built rather than building them
+        again. Queries made meanwhile by other threads may see the lexicon
+        part way through the change.'''
+        self.changeEntries((), lines)
+
+    def removeEntries(self, lines):
+        '''Remove lines in the format of the lexicon file from the lexicon,
+        patching the indexes already built. Lines not in the lexicon are
+        ignored. Queries made meanwhile by other threads may see the
+        lexicon part way through the change.'''
+        self.changeEntries(lines, ())
+
+    def changeEntries(self, removed, added):
+        '''Remove the lines removed and add the lines added, as
+        removeEntries and addEntries do'''
+        with self.lock:
+            self.startUpdate()
+            self.removeLines(removed)
+            self.addLines(added)
+            if self.compact:
+                self.compactIndexes()
+
+    def addLines(self, lines):
+        '''Add lines to the lexicon, patching the indexes already built'''
+        newWords = []
+        anags = self.__dict__.get('anags')
+        for line in lines:
+            if line.startswith('#'):
+                continue
+            word, normal, variants = self.parseLine(line)
+            if normal not in self.refs:
+                newWords.append(normal)
+            self.addEntry(word, normal, variants)
+        if anags is not None:
+            for word in self.anagWords:
+                anags.setdefault(self.anagramHash(word), []).append(word)
+            self.anagWords = []
+        if 'prons' in self.__dict__:
+            indexProns(self.prons, self.spells, self.pronLines)
+            self.pronLines = []
+        if 'words' in self.__dict__:
+            insertSorted(self.words, newWords)
+        if 'reversedWords' in self.__dict__:
+            insertSorted(self.reversedWords,
+                         [word[::-1] for word in newWords])
+
+    def removeLines(self, lines):
+        '''Remove lines from the lexicon, patching the indexes already
+        built'''
+        anags = self.__dict__.get('anags')
+        for line in lines:
+            if line.startswith('#'):
+                continue
+            word, normal, variants = self.parseLine(line)
+            if not self.refs.discard(normal, word):
+                continue
+            self.numLines -= 1
+            if variants:
+                self.numProns -= 1
+                self.numVars -= variants.count(', ') + 1
+                self.removeProns(word, normal, variants)
+            if normal not in self.refs:
+                if 'words' in self.__dict__:
+                    removeSorted(self.words, normal)
+                if 'reversedWords' in self.__dict__:
+                    removeSorted(self.reversedWords, normal[::-1])
+            if anags is None:
+                self.anagWords.remove(word)
+            else:
+                hash = self.anagramHash(word)
+                anags[hash].remove(word)
+                if not anags[hash]:
+                    del anags[hash]
+
+    def removeProns(self, word, normal, variants):
+        '''Remove the pronunciations of one line of the lexicon file, whose
+        word has already been removed from self.refs'''
+        if 'prons' not in self.__dict__:
+            self.pronLines.remove((normal, word, variants))
+            return
+        for variant in variants.split(', '):
+            spelled = self.spells.get(variant)
+            if spelled and word in spelled:
+                spelled.remove(word)
+                if not spelled:
+                    del self.spells[variant]
+        # keep those still given by other lines for the same normal form
+        forms = self.refs.get(normal, ())
+        wordProns = [variant for variant in self.prons.get(normal, ())
+                     if any(form in self.spells.get(variant, ())
+                            for form in forms)]
+        if wordProns:
+            self.prons[normal] = wordProns
+        else:
+            self.prons.pop(normal, None)
+
+    def startUpdate(self):
+        '''Get ready for the indexes to be patched. Any of those which can
+        be patched but are still only in the snapshot are restored from it,
+        as it will no longer match; those which cannot are dropped, to be
+        built again when next needed; and anything worked out from the
+        words as they were is forgotten.'''
+        if self.snapshot:
+            self.buildIndexes(*(name for name in PATCHED
+                                if name in self.snapshot))
+            self.snapshot.close()
+            self.snapshot = None
+        self.expandIndexes()
+        for name in DROPPED:
+            self.__dict__.pop(name, None)
+        self.cache.clear()
+        self.closeSearchPool()
+
+    def compactIndexes(self):
+        '''Replace the indexes of strings with compact ones, which hold the
+        same strings in a few large objects rather than many small ones.
+        The forms of the words are stored once, in the order of the words,
+        and the other indexes refer to them by position.'''
+        self.buildIndexes(*PATCHED)
+        if isinstance(self.refs, CompactMap):
+            return
+        words = StringTable(self.words)
+        refs = compactMap(self.refs, words)
+        forms = refs.valueTable
+        formIds = dict(zip(forms, range(len(forms))))   # any ID will do
+        anags = compactMap(self.anags, values=forms, valueIds=formIds)
+        spells = compactMap(self.spells, values=forms, valueIds=formIds)
+        pronIds = { pron: i for i, pron in enumerate(spells.keyTable) }
+        prons = compactMap(self.prons, values=spells.keyTable,
+                           valueIds=pronIds)
+        if 'reversedWords' in self.__dict__:
+            self.reversedWords = StringTable(self.reversedWords)
+        self.words, self.refs, self.anags = words, refs, anags
+        self.prons, self.spells = prons, spells
+
+    def expandIndexes(self):
+        '''Replace compact indexes with the lists and dicts which can be
+        patched'''
+        if not isinstance(self.refs, CompactMap):
+            return
+        self.refs = RefMap(self.refs.items())
+        for name in ('words', 'reversedWords'):
+            if name in self.__dict__:
+                setattr(self, name, list(getattr(self, name)))
+        for name in ('anags', 'prons', 'spells'):
+            if name in self.__dict__:
+                setattr(self, name, dict(getattr(self, name).items()))
+
+    def buildIndexes(self, *names):
+        '''Make sure that the named LAZY_INDEXES have been built'''
+        for name in names:
+            getattr(self, name)
+
+    # Each builder assigns its indexes only when they are complete, since
+    # other threads read them without taking the lock
+
+    def buildWords(self):
+        '''Build the sorted list of normalized word forms for lookup'''
+        words = self.fromSnapshot('words')
+        if words is None:
+            words = sorted(self.refs)   # includes only the keys
+        self.words = words
+
+    def buildReversedWords(self):
+        '''Build the sorted list of reversed word forms for suffix lookup.
+        It is cheap enough to build from self.words not to be saved'''
+        reversedWords = sorted(word[::-1] for word in self.words)
+        if self.compact:
+            reversedWords = StringTable(reversedWords)
+        self.reversedWords = reversedWords
+
+    def buildTrigrams(self):
+        '''Build the index from each trigram to an array of the ascending
+        positions in self.words of the words which contain it'''
+        index = self.fromSnapshot('trigrams')
+        if index is None:
+            index = self.ngramIndex(3)
+        self.trigrams = index
+
+    def buildBigrams(self):
+        '''Build the like index of bigrams, needed only for patterns whose
+        literals are all short, and so not saved'''
+        self.bigrams = self.ngramIndex(2)
+
+    def buildWordBuffer(self):
+        '''Build the single string of all the words, one per line, which
+        lets a regex be searched for in all of them at once'''
+        words = self.words
+        starts = lineStarts(words)
+        self.wordBuffer = '\n'.join(words)
+        self.wordStarts = starts
+
+    def ngramIndex(self, n):
+        '''Return a dict from each n-gram to an array of the ascending
+        positions in self.words of the words which contain it'''
+        index = defaultdict(partial(array, 'I'))
+        for i, word in enumerate(self.words):
+            for gram in ngrams(word, n):
+                index[gram].append(i)
+        return dict(index)
+
+    def buildAnags(self):
+        '''Build the dictionary of normalized anagram forms'''
+        anags = self.fromSnapshot('anags')
+        if anags is None:
+            anags = defaultdict(list)
+            words = self.anagWords
+            for word, hash in zip(words, self.anagramHashes(words)):
+                anags[hash].append(word)
+        self.anags = anags
+        self.anagWords = []
+
+    def buildAnagKeys(self):
+        '''Build the sorted list of anagram hashes, which subanagrams
+        searches as a trie, each hash being a path of sorted letters'''
+        anags = self.anags
+        self.anagKeys = (anags.keyTable if isinstance(anags, CompactMap)
+                         else sorted(anags))
+
+    def buildProns(self):
+        '''Build the pronunciation-related dictionaries'''
+        prons = self.fromSnapshot('prons')
+        spells = self.fromSnapshot('spells')
+        if prons is None or spells is None:
+            prons = defaultdict(list)
+            spells = defaultdict(list)
+            indexProns(prons, spells, self.pronLines)
+        self.prons, self.spells = prons, spells
+        self.pronLines = []
+
+    def anagramHashes(self, words):
+        '''Return a list of the anagram hashes of the list of words, using
+        worker processes as well if the list is long enough'''
+        if self.jobs <= 1 or len(words) < PARALLEL_WORDS:
+            return self.hashText('\n'.join(words))
+        size = len(words) // (self.jobs * SHARDS_PER_JOB) + 1
+        shards = ['\n'.join(words[i:i+size])
+                  for i in range(0, len(words), size)]
+        hashes = []
+        with self.pool() as pool:
+            for shard in pool.imap(hashShard, shards):
+                hashes.extend(shard.split('\n'))
+        return hashes
+
+    def loadSnapshot(self, snapshotName, key):
+        '''Restore the indexes from a snapshot made with the same key, and
+        return whether this was possible. Only the references and the counts
+        are restored at once: other indexes are restored when needed'''
+        snapshot = loadSnapshot(snapshotName, key)
+        if not snapshot:
+            return False
+        self.snapshot = snapshot
+        self.refs = snapshot.section('refs')
+        self.numLines, self.numProns, self.numVars = \
+            snapshot.section('counts')
+        return True
+
+    def fromSnapshot(self, name):
+        '''Return the index name from the snapshot in use, if any'''
+        if self.snapshot and name in self.snapshot:
+            return self.snapshot.section(name)
+        return None
+
+    def lineSpool(self):
+        '''Return a temporary file in the cache directory to copy the entry
+        lines of the lexicon file to as they are read, as UTF-8, for its
+        snapshot, or None if one cannot be made'''
+        try:
+            os.makedirs(self.cacheDir, exist_ok=True)
+            return tempfile.TemporaryFile(dir=self.cacheDir)
+        except OSError:
+            return None
+
+    def saveSnapshot(self, snapshotName, key, lines):
+        '''Save the indexes which have been built for use next time, along
+        with the spool file of the entry lines they were built from, so
+        that they can be brought up to date when the file changes. Failure
+        doesn't matter beyond the loss of time when the lexicon is next
+        read'''
+        sections = { name: getattr(self, name) for name in SECTIONS
+                     if name in self.__dict__ }
+        sections['counts'] = self.numLines, self.numProns, self.numVars
+        sections['lines'] = lines
+        return saveSnapshot(snapshotName, key, sections)
+
+    def updateSnapshot(self, snapshotName, key, f, busyWait):
+        '''Restore the indexes from a snapshot of an earlier state of the
+        open lexicon file f, patch them with the lines removed from and
+        added to it since, and save them as a snapshot of its present
+        state. Return whether this was possible: if much of the file has
+        changed it is quicker to read it afresh.'''
+        snapshot = loadSnapshot(snapshotName, key, stale=True)
+        if not snapshot or 'lines' not in snapshot:
+            return False
+        lines = self.lineSpool()
+        if not lines:
+            snapshot.close()
+            return False
+        busyWait(NORMALIZING, 0)
+        count = 0
+        for entries in readEntries(f):
+            if entries:
+                spoolLines(lines, '\n'.join(entries))
+                count += len(entries)
+        lines.flush()
+        size = lines.tell()
+        # the new lines are compared where they lie, as are the old ones
+        buffer = (mmap.mmap(lines.fileno(), size, access=mmap.ACCESS_READ)
+                  if size else b'')
+        try:
+            changes = diffRegions(snapshot.region('lines'),
+                                  (buffer, 0, size),
+                                  MAX_CHANGE * max(count, 1))
+        finally:
+            if size:
+                buffer.close()
+        if changes is None:
+            lines.close()
+            snapshot.close()
+            f.seek(0)
+            return False
+        self.snapshot = snapshot
+        self.refs = snapshot.section('refs')
+        self.numLines, self.numProns, self.numVars = \
+            snapshot.section('counts')
+        self.changeEntries(*changes)
+        self.saveSnapshot(snapshotName, key, lines)
+        lines.close()
+        return True
 
     def normalized(self, s, caseBlind, diacFilter):
         '''Apply needed transformations to ignore case and/or accents'''
         if caseBlind:
             s = s.casefold()
-        if diacFilter:
+        # ASCII strings have neither decompositions nor combining marks
+        if diacFilter and not s.isascii():
             s = ud.normalize('NFKD', s)
             s = s.translate(self.diacFilter)
         return s
@@ -156,6 +658,9 @@ class Lexicon:
         '''Create a unique hash for anagram purposes, ignoring
         order, letter-case, and all punctuation. Diacritics
         are ignored only if self.diacFilter is set'''
+        if s.isascii():   # as asciiAnagramHashes does
+            s = s.encode('ascii').translate(ASCII_LOWER, ASCII_NONWORD)
+            return ''.join(sorted(s.decode('ascii')))
         # Unfortunately the \w class (Unicode 'word' characters)
         # includes the underscore, so _ must be special-cased
         s = s.replace('_', '')
@@ -164,13 +669,38 @@ class Lexicon:
         return ''.join(sorted(re.sub(r'\W', '',
                         self.normalized(s, True, self.diacFilter))))
 
+    def hashText(self, text):
+        '''Return a list of the anagram hashes of the newline-separated
+        words in text, hashing all the ASCII ones in one batch'''
+        if text.isascii():
+            return asciiAnagramHashes(text)
+        words = text.split('\n')
+        isAscii = [word.isascii() for word in words]
+        hashes = iter(asciiAnagramHashes('\n'.join(compress(words,
+                                                            isAscii))))
+        return [next(hashes) if ascii else self.anagramHash(word)
+                for word, ascii in zip(words, isAscii)]
+
+    def startWarmUp(self):
+        '''Start loading WordNet for self.language in the background.
+        WordNet queries wait until it is done'''
+        self.warm.clear()
+        threading.Thread(target=self.warmUp, daemon=True).start()
+
+    def warmUp(self):
+        '''Load WordNet, and the lemmas of self.language, in the background
+        so that the first WordNet query need not. Any failure is left for
+        that query to report'''
+        try:
+            self.wordnet.warmUp(self.language)
+        except Exception:
+            pass
+        finally:
+            self.warm.set()
+
     def WNInfo(self, word, kinds):
         '''Return a list of WordNetInfo tuples of information about word'''
-
-        def WNNormalized(word):
-            '''Return a WordNet-normalized version of word: all lower-case and
-            no apostrophes'''
-            return word.lower().replace("'", '')
+        self.warm.wait()     # rather than load WordNet a second time
 
         def addName(dic, key, name):
             '''Create dic[key] as an empty list if necessary and append name
@@ -181,48 +711,41 @@ class Lexicon:
             if name not in lst:
                 lst.append(name)
 
-        def excludeName(kind, lemma):
+        def excludeName(kind, lemmaName):
             '''Return whether this lemma should be excluded because the kind
             is restricted to strict lemmas of the headword'''
             return ((WNKINDS[kind].EXTENT == WNE.HEAD) and 
-                    (lemma.name() not in heads))
+                    (lemmaName not in heads))
 
         results = []
         heads = set()
         for cat in WNCATS.keys():
-            heads.add(wnl.lemmatize(word, cat))
-        levelKinds = {}
-        for level in (WNL.SYN, WNL.LEM, WNL.SUB):
-            levelKinds[level] = [kind for kind in kinds
-                                 if WNKINDS[kind].LEVEL == level]
-        for synset in wn.synsets(WNNormalized(word), lang=self.language):
-            synset_base, synset_pos, synset_number = synset.name().split('.')
-            info = OrderedDict()
+            heads.add(self.wordnet.lemmatize(word, cat))
+        # The senses are the same for all forms of word, eg Polish and
+        # polish; only which lemmas count as the headword differs
+        kinds = tuple(kinds)
+        key = (WNNormalized(word), self.language, kinds)
+        senses = self.wnCache.get(key, partial(self.wordnet.senses, *key))
+        for synset_base, synset_pos, synset_number, synInfo, lemmas, subs \
+                in senses:
             # relations defined as synset.RELATION  
-            for kind in levelKinds[WNL.SYN]:
-                info[kind] = getattr(synset, kind)()
-            for lemma in synset.lemmas(lang=self.language):
+            info = OrderedDict(synInfo)
+            for lemmaName, lemmaInfo in lemmas:
                 # synonyms are a special case: they are simply synset.lemma
                 if 'synonyms' in kinds:
-                    addName(info, 'synonyms', lemma.name())
+                    addName(info, 'synonyms', lemmaName)
                 # relations defined as synset.lemma.RELATION
-                for kind in levelKinds[WNL.LEM]:
-                    if excludeName(kind, lemma):
+                for kind, names in lemmaInfo:
+                    if excludeName(kind, lemmaName):
                         continue
-                    for nym in getattr(lemma, kind)():
-                        try:
-                            name = nym.name()
-                        except AttributeError:
-                            name = nym
+                    for name in names:
                         addName(info, kind, name)
             # relations defined as synset.RELATION.lemma
-            for kind in levelKinds[WNL.SUB]:
-                for item in getattr(synset, kind)():
-                    for lemma in item.lemmas(lang=self.language):
-                        if excludeName(kind, lemma):
-                            continue
-                        name = lemma.name()
-                        addName(info, kind, name)
+            for kind, names in subs:
+                for name in names:
+                    if excludeName(kind, name):
+                        continue
+                    addName(info, kind, name)
             # make the output be of the required type
             for key in info.keys():
                 if ((WNKINDS[key].OUTTYPE == str) and
@@ -239,13 +762,13 @@ class Lexicon:
 
     @property
     def hasWordNet(self):
-        return WORDNET
+        return self.wordnet is not None
 
-    @staticmethod
-    def languages():
+    def languages(self):
         '''Return a list of the ISO 639-3 codes for the WordNet-supported
         languages.'''
-        return wn.langs() if WORDNET else []
+        self.warm.wait()
+        return self.wordnet.langs() if self.wordnet else []
 
     def getLanguage(self):
         '''Return the language for WordNet lookups'''
@@ -253,40 +776,66 @@ class Lexicon:
 
     def setLanguage(self, language):
         '''Set the language for WordNet lookups if it is supported'''
-        if language in self.languages():
+        if language in self.languages() and language != self.language:
             self.language = language
+            if self.warmup:   # load its lemmas while the user types
+                self.startWarmUp()
 
     def stats(self):
-        '''Return the number of various things as a tuple'''
-        return self.numLines, self.numProns, self.numVars
+        '''Return the number of various things as a LexiconStats tuple'''
+        return LexiconStats(self.numLines, self.numProns, self.numVars,
+                            self.cache.hits, self.cache.misses)
+
+    def cached(self, operation, argument, compute):
+        '''Return the result of an operation on a normalized argument from
+        the cache, calling compute() for it if it is not there'''
+        return self.cache.get(self.cacheKey(operation, argument), compute)
+
+    def cacheKey(self, operation, argument):
+        '''Return the key under which the result of an operation on a
+        normalized argument is cached'''
+        return (operation, argument, bool(self.caseBlind),
+                bool(self.diacFilter))
 
     def contains(self, word):
         '''Return a list of matching spellings: its main purpose
         is to return a list of different headwords after normalization'''
         word = self.normalized(word, self.caseBlind, self.diacFilter)
-        i = bisect.bisect_left(self.words, word)
-        if i != len(self.words) and self.words[i] == word:
-            return self.refs[word]
-        else:
-            return []
+        return self.refs.get(word, [])
 
-    def prefixed(self, prefix):
-        '''Return a list of words with prefix'''
+    def prefixed(self, prefix, limit=None, offset=0):
+        '''Return a list of words with prefix, in order, skipping the first
+        offset of them and returning no more than limit if it is given.
+        Negative offsets and limits count as 0'''
         prefix = self.normalized(prefix, self.caseBlind, self.diacFilter)
-        return [ ' '.join(self.refs[w]) for w in self.words
-                    if w.startswith(prefix) ]
+        lo, hi = prefixRange(self.words, prefix)
+        lo = min(lo + max(offset, 0), hi)
+        if limit is not None:
+            hi = min(lo + max(limit, 0), hi)
+        return [ ' '.join(self.refs[w]) for w in self.words[lo:hi] ]
 
-    def suffixed(self, suffix):
-        '''Return a list of words with suffix'''
+    def suffixed(self, suffix, limit=None, offset=0):
+        '''Return a list of words with suffix, in order, skipping the first
+        offset of them and returning no more than limit if it is given.
+        Negative offsets and limits count as 0'''
         suffix = self.normalized(suffix, self.caseBlind, self.diacFilter)
-        return [ ' '.join(self.refs[w]) for w in self.words
-                    if w.endswith(suffix) ]
+        lo, hi = prefixRange(self.reversedWords, suffix[::-1])
+        # the words with suffix are together in reversedWords but not in
+        # order, so all of them must be looked at, but only those to be
+        # returned need be sorted
+        words = (w[::-1] for w in self.reversedWords[lo:hi])
+        offset = max(offset, 0)
+        if limit is None:
+            words = sorted(words)
+        else:
+            words = heapq.nsmallest(offset + max(limit, 0), words)
+        return [ ' '.join(self.refs[w]) for w in words[offset:] ]
 
     def definitions(self, word):
         '''Return a list of WordNetInfo tuples for each sense of word.
         Each tuple will contain the definition and list, possibly empty,
         of examples.'''
-        if WORDNET:
+        if self.wordnet:
             word = self.normalized(word, False, self.diacFilter)
             return self.WNInfo(word, [key for key, val in WNKINDS.items()
                                      if val.GROUP == WNG.DEFS])
@@ -296,7 +845,7 @@ class Lexicon:
     def related(self, word):
         '''Return a list of WordNetInfo tuples for each sense of word.
         Each tuple will contain possibly empty lists of synonyms etc.'''
-        if WORDNET:
+        if self.wordnet:
             word = self.normalized(word, False, self.diacFilter)
             return self.WNInfo(word, [key for key, val in WNKINDS.items()
                                       if val.GROUP == WNG.RELS])
@@ -310,9 +859,14 @@ class Lexicon:
 
     def homophones(self, word):
         '''Return a list of homophones of the word'''
+        word = self.normalized(word, self.caseBlind, self.diacFilter)
+        return self.cached('homophones', word,
+                           partial(self.findHomophones, word))
+
+    def findHomophones(self, word):
+        '''Return a list of homophones of the normalized word'''
         results = []
-        prons = self.prons.get(self.normalized(word, self.caseBlind,
-                                               self.diacFilter))
+        prons = self.prons.get(word)
         if prons:
             for pron in prons:
                 for variant in self.spells[pron]:
@@ -322,22 +876,441 @@ class Lexicon:
 
     def anagrams(self, word):
         '''Return a list of anagrams of word, ignoring case and punctuation''' 
-        return self.anags.get(self.anagramHash(word), [])
+        key = self.anagramHash(word)
+        return self.cached('anagrams', key, lambda: self.anags.get(key, []))
+
+    def subanagrams(self, letters, minLength=MIN_SUBANAGRAM):
+        '''Return a list of the words which can be spelled with some or all
+        of letters, each used no more often than it appears there, ignoring
+        case and punctuation. Words with fewer than minLength letters are
+        left out; the longest come first, and then in alphabetical order'''
+        return self.cache.get(*self.subanagramsQuery(letters, minLength))
+
+    def subanagramsQuery(self, letters, minLength=MIN_SUBANAGRAM):
+        '''Return the cache key for subanagrams(letters, minLength), and a
+        function working out its result without using the cache'''
+        key = self.anagramHash(letters)
+        return (self.cacheKey('subanagrams', (key, minLength)),
+                partial(self.findSubanagrams, key, minLength))
+
+    def findSubanagrams(self, key, minLength):
+        '''Return the words for subanagrams whose letters are a sub-multiset
+        of the anagram hash key'''
+        words = [(-len(hash), word)
+                 for hash in self.subanagramHashes(key, minLength)
+                 for word in self.anags[hash]]
+        return [word for length, word in sorted(words)]
+
+    def subanagramHashes(self, key, minLength):
+        '''Return a list of the anagram hashes in the lexicon of at least
+        minLength letters which are a sub-multiset of the hash key'''
+        # The sorted hashes form an implicit trie: those beginning with a
+        # prefix are a range of them, found by bisection. A hash can only
+        # go on with a letter no earlier than its last, so the letters of
+        # key still available are those after the last one used
+        keys = self.anagKeys
+        bisectLeft = bisect.bisect_left
+        # from each position in key, the first of each letter after it,
+        # with the letter which follows it in sort order
+        choices = [[(i, key[i], chr(ord(key[i]) + 1))
+                    for i in range(start, len(key))
+                    if i == start or key[i] != key[i-1]]
+                   for start in range(len(key) + 1)]
+        found = []
+        stack = [('', 0, 0, len(keys))]   # prefix, position in key, range
+        while stack:
+            prefix, start, lo, hi = stack.pop()
+            if len(prefix) >= minLength and lo < hi and keys[lo] == prefix:
+                found.append(prefix)
+            for i, letter, successor in choices[start]:
+                longer = prefix + letter
+                # the letters come in order, and so do their ranges
+                lo = bisectLeft(keys, longer, lo, hi)
+                if lo < hi and keys[lo].startswith(longer):
+                    end = bisectLeft(keys, prefix + successor, lo, hi)
+                    stack.append((longer, i + 1, lo, end))
+                    lo = end
+        return found
+
+    def phraseAnagrams(self, letters, maxWords=MAX_PHRASE_WORDS,
+                       minLength=MIN_PHRASE_WORD, maxResults=MAX_PHRASES,
+                       seconds=PHRASE_SECONDS):
+        '''Yield phrases of no more than maxWords words, each of at least
+        minLength letters, which are anagrams of letters, ignoring case and
+        punctuation, as they are found. Those with longer words are looked
+        for first, and the words of each come longest first. No more than
+        maxResults are yielded, and none after seconds'''
+        deadline = time.perf_counter() + seconds
+        key = self.anagramHash(letters)
+        if not key or maxWords < 1 or maxResults < 1:
+            return
+        # The count of each letter of key is a field of the bits of an
+        # integer, with a spare top bit: subtracting the counts of a hash
+        # with more of some letter than is left borrows it, showing that
+        # the hash doesn't fit
+        width = max(key.count(letter) for letter in key).bit_length() + 1
+        shifts = { letter: i * width
+                   for i, letter in enumerate(sorted(set(key))) }
+        guards = sum(1 << (shift + width - 1) for shift in shifts.values())
+        # The only words which can be used are sub-anagrams of key
+        hashes = sorted(self.subanagramHashes(key, minLength),
+                        key=lambda hash: (-len(hash), hash))
+        counts = [sum(1 << shifts[letter] for letter in hash)
+                  for hash in hashes]
+        lengths = [len(hash) for hash in hashes]
+        position = { count: i for i, count in enumerate(counts) }
+
+        def search(remaining, length, start, usable, words):
+            '''Yield tuples of the ascending positions in hashes, from
+            start on, of the hashes which together have the remaining
+            counts, adding up to length, in no more than words of them.
+            usable is the positions of those which fit, unless only one
+            more word may be added'''
+            if words == 1:
+                i = position.get(remaining)
+                if i is not None and i >= start:
+                    yield (i,)
+                return
+            for k, i in enumerate(usable):
+                # the hashes come longest first: none after this one is
+                # long enough to be the longest of the rest of a phrase
+                if lengths[i] * words < length:
+                    return
+                if time.perf_counter() > deadline:
+                    return
+                rest = remaining - counts[i]
+                if not rest:
+                    yield (i,)
+                    continue
+                fitting = None
+                if words > 2:
+                    fitting = [j for j in usable[k:]
+                               if ((rest | guards) - counts[j]) & guards
+                                   == guards]
+                for tail in search(rest, length - lengths[i], i, fitting,
+                                   words - 1):
+                    yield (i,) + tail
+
+        total = sum(1 << shifts[letter] for letter in key)
+        found = 0
+        for phrase in search(total, len(key), 0, range(len(hashes)),
+                             maxWords):
+            # each hash stands for several words, which may be repeated
+            choices = [combinations_with_replacement(self.anags[hashes[i]],
+                                                     len(list(repeats)))
+                       for i, repeats in groupby(phrase)]
+            for words in product(*choices):
+                yield ' '.join(word for group in words for word in group)
+                found += 1
+                if found >= maxResults:
+                    return
 
     def regex(self, pattern):
         '''Return list of matching words'''
+        return self.cache.get(*self.regexQuery(pattern))
+
+    def regexQuery(self, pattern):
+        '''Return the cache key for regex(pattern), and a function working
+        out its result without using the cache'''
+        return self.cacheKey('regex', pattern), partial(self.search, pattern)
+
+    def search(self, pattern):
+        '''Return list of words matching the pattern string'''
         # we can normalize case but we can't do anything about diacritics
         flags = re.IGNORECASE if self.caseBlind else 0
         try:
             pattern = re.compile(pattern, flags)
         except Exception as err:   # probably an invalid regex
             raise LexiconError(str(err))
-        matches = []
-        for word in self.words:
-            m = pattern.search(word)
-            if m:
-                matches.extend(self.refs[word])
-        return matches
+        candidates = self.regexCandidates(pattern)
+        if candidates is None and self.parallelSearch():
+            words = self.words
+            hits = self.searchInParallel(pattern)
+            return self.refs.extend([], (words[i] for i in hits))
+        if candidates is None and bufferable(pattern):
+            # nothing to narrow the search, so do it in one pass over all
+            # the words rather than a Python-level loop over each of them
+            words = self.words
+            hits = bufferSearch(pattern, words, self.wordBuffer,
+                                self.wordStarts)
+            return self.refs.extend([], (words[i] for i in hits))
+        words = (self.words if candidates is None
+                 else [self.words[i] for i in candidates])
+        return self.refs.extend([], filter(pattern.search, words))
+
+    def regexCandidates(self, pattern):
+        '''Return the ascending positions in self.words of the only words
+        which compiled pattern could match, judging by the trigrams (or for
+        short ones, bigrams) of the literal strings it requires, or None if
+        it requires none'''
+        literals = requiredLiterals(pattern, folded=self.caseBlind)
+        grams = set()
+        for literal in literals:
+            grams.update(ngrams(literal, 3))
+        if not grams:
+            grams = {literal for literal in literals if len(literal) == 2}
+            if not grams:
+                return None
+        index = self.trigrams if len(next(iter(grams))) == 3 else self.bigrams
+        postings = []
+        for gram in grams:
+            if gram not in index:
+                return []
+            postings.append(index[gram])
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates.intersection_update(posting)
+            if not candidates:
+                break
+        return sorted(candidates)
+
+    def parallelSearch(self):
+        '''Return whether a regex search of all the words should be shared
+        among worker processes: there must be several jobs and enough words,
+        and the workers must be able to be forked with the words in place'''
+        if self.jobs <= 1 or len(self.words) < PARALLEL_SEARCH:
+            return False
+        import multiprocessing
+        return 'fork' in multiprocessing.get_all_start_methods()
+
+    def searchInParallel(self, pattern):
+        '''Return the ascending positions in self.words of the words matched
+        by compiled pattern, searching contiguous runs of them in a pool of
+        self.jobs worker processes. If self.timeout seconds pass first the
+        workers are killed and a LexiconError raised.'''
+        import multiprocessing
+        size = len(self.words) // (self.jobs * SHARDS_PER_WORKER) + 1
+        shards = [(pattern, start, start + size)
+                  for start in range(0, len(self.words), size)]
+        with self.lock:
+            if self.searchPool is None:
+                self.searchPool = self.forkSearchers()
+            pool = self.searchPool
+        try:
+            # map returns the runs in order, so the hits stay sorted
+            results = pool.map_async(searchShard, shards).get(self.timeout)
+        except multiprocessing.TimeoutError:
+            self.closeSearchPool()
+            raise LexiconError('Search took longer than {:g} seconds'
+                               .format(self.timeout))
+        return [i for hits in results for i in hits]
+
+    def forkSearchers(self):
+        '''Return a pool of self.jobs processes forked from this one, so
+        that they share this Lexicon's words without copying them. The
+        pool keeps it for workers which it starts later to replace others'''
+        import multiprocessing
+        self.buildIndexes('words')
+        self.warm.wait()    # no loading threads at a fork
+        context = multiprocessing.get_context('fork')
+        return context.Pool(self.jobs, initializer=initSearchLexicon,
+                            initargs=(self,))
+
+    def closeSearchPool(self):
+        '''Kill any worker processes searching this Lexicon. They are
+        forked again when next needed, so this must be called whenever
+        the words change'''
+        with self.lock:
+            pool, self.searchPool = self.searchPool, None
+        if pool is not None:
+            pool.terminate()
+
+def readEntries(f):
+    '''Read the open lexicon file f a chunk at a time, yielding for each
+    chunk a list of the whole lines in it which are entries rather than
+    comments, without their newlines'''
+    tail = ''
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        lines = (tail + chunk).split('\n')
+        tail = lines.pop()   # incomplete (or empty) last line
+        yield [line for line in lines if not line.startswith('#')]
+    if tail and not tail.startswith('#'):
+        yield [tail]
+
+def spoolLines(spool, text):
+    '''Write the newline-separated lines of text, of which there is at
+    least one, to the spool file as UTF-8, each ending with a newline'''
+    spool.write((text + '\n').encode('utf-8'))
+
+def diffRegions(old, new, most):
+    '''Return lists of the lines removed from the region old and added to
+    it to make the region new, ignoring their order, or None if there are
+    more than most of them. Each region is a buffer, such as an mmap, and
+    the start and end in it of newline-terminated UTF-8 lines. Usually only
+    a few lines have changed, so the lines which begin and end both regions
+    alike are found by comparing their bytes, and only those in between
+    are compared line by line, by their hashes, and decoded if changed'''
+    oldBuffer, oldStart, oldEnd = old
+    newBuffer, newStart, newEnd = new
+    # the lines wholly within the common start of the regions
+    length = sameRun(old, new)
+    cut = oldBuffer.rfind(b'\n', oldStart, oldStart + length)
+    head = cut + 1 - oldStart if cut >= 0 else 0
+    # and those after the first newline within the common end, not
+    # counting those already matched
+    length = sameRun(old, new, True,
+                     min(oldEnd - oldStart, newEnd - newStart) - head)
+    cut = oldBuffer.find(b'\n', oldEnd - length, oldEnd)
+    tail = oldEnd - cut - 1 if cut >= 0 else 0
+    old = oldBuffer, oldStart + head, oldEnd - tail
+    new = newBuffer, newStart + head, newEnd - tail
+    oldCount = Counter(map(hash, regionLines(*old)))
+    newCount = Counter(map(hash, regionLines(*new)))
+    removed, added = oldCount - newCount, newCount - oldCount
+    if sum(removed.values()) + sum(added.values()) > most:
+        return None
+    return pickLines(old, removed), pickLines(new, added)
+
+def sameRun(a, b, backwards=False, limit=None, block=1 << 12):
+    '''Return the length of the run of bytes which the regions a and b,
+    each a buffer and a start and end in it, have in common at their
+    starts, or if backwards is set at their ends, up to limit bytes.
+    Blocks of bytes are compared at a time, then single ones'''
+    aBuffer, aStart, aEnd = a
+    bBuffer, bStart, bEnd = b
+    if limit is None:
+        limit = min(aEnd - aStart, bEnd - bStart)
+    if backwards:
+        same = lambda i, n: (aBuffer[aEnd-i-n:aEnd-i] ==
+                             bBuffer[bEnd-i-n:bEnd-i])
+    else:
+        same = lambda i, n: (aBuffer[aStart+i:aStart+i+n] ==
+                             bBuffer[bStart+i:bStart+i+n])
+    done = 0
+    while done + block <= limit and same(done, block):
+        done += block
+    while done < limit and same(done, 1):
+        done += 1
+    return done
+
+def regionLines(buffer, start, end):
+    '''Yield the newline-terminated lines of buffer between start and end
+    as bytes, without their newlines, reading about CHUNK_SIZE bytes of
+    them at a time'''
+    while start < end:
+        stop = buffer.rfind(b'\n', start, min(start + CHUNK_SIZE, end))
+        if stop < 0:    # a line longer than a chunk
+            stop = buffer.find(b'\n', start, end)
+        yield from buffer[start:stop].split(b'\n')
+        start = stop + 1
+
+def pickLines(region, counts):
+    '''Return a list of the lines of the region whose hashes are in the
+    Counter counts, as many of each as it counts'''
+    lines = []
+    if counts:
+        for line in regionLines(*region):
+            h = hash(line)
+            if counts[h] > 0:
+                counts[h] -= 1
+                lines.append(line.decode('utf-8'))
+    return lines
+
+def indexProns(prons, spells, pronLines):
+    '''Add the (normal, word, variants) of pronLines to the indexes from
+    normalized spellings to pronunciations and back'''
+    for normal, word, variants in pronLines:
+        wordProns = prons.setdefault(normal, [])
+        for variant in variants.split(', '):
+            if variant not in wordProns:
+                wordProns.append(variant)
+            spells.setdefault(variant, []).append(word)
+
+def insertSorted(words, newWords):
+    '''Insert the newWords into the sorted list words, keeping it sorted'''
+    if len(newWords) <= INSORT_MAX:
+        for word in newWords:
+            bisect.insort(words, word)
+    else:
+        words[:] = heapq.merge(words, sorted(newWords))
+
+def removeSorted(words, word):
+    '''Remove word from the sorted list words'''
+    i = bisect.bisect_left(words, word)
+    if i < len(words) and words[i] == word:
+        del words[i]
+
+def prefixRange(words, prefix):
+    '''Return the range lo, hi of the indexes in the sorted list words
+    of the words which begin with prefix'''
+    lo = bisect.bisect_left(words, prefix)
+    # They all sort before the successor of prefix: its last character
+    # incremented, once any characters which can't be are dropped
+    stem = prefix.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return lo, len(words)
+    successor = stem[:-1] + chr(ord(stem[-1]) + 1)
+    return lo, bisect.bisect_left(words, successor, lo)
+
+### Parallel building of the indexes ###
+
+shardLexicon = None   # used by each worker process to parse its lines
+
+def initShardLexicon(caseBlind, idiac):
+    '''Create an empty Lexicon in a worker process, so that lines are
+    normalized and hashed exactly as in the parent'''
+    global shardLexicon
+    shardLexicon = Lexicon({'icase': caseBlind, 'idiac': idiac})
+
+def parseShard(shard):
+    '''Parse the lines in the byte range [start, end) of a lexicon file,
+    returning the fields from Lexicon.parseLine as three columns of
+    newline-separated strings, which are much quicker to send back to the
+    parent than lists, and a fourth of the entry lines themselves if
+    keepLines is set. Range boundaries fall just after a newline, so the
+    encoding must be ASCII-compatible'''
+    fileName, start, end, encoding, keepLines = shard
+    with open(fileName, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode(encoding)
+    # universal newlines, as in the text-mode read of readChunks
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    if not lines[-1]:
+        lines.pop()       # the shard ended with a newline
+    entries = [shardLexicon.parseLine(line) for line in lines
+               if not line.startswith('#')]
+    if not entries:
+        return None
+    words, normals, variants = zip(*entries)
+    # the normalized forms are often the words themselves
+    return ('\n'.join(words),
+            None if normals == words else '\n'.join(normals),
+            '\n'.join(variants),
+            '\n'.join(line for line in lines if not line.startswith('#'))
+            if keepLines else None)
+
+def hashShard(shard):
+    '''Return the anagram hashes of a newline-separated string of words
+    as another such string'''
+    return '\n'.join(shardLexicon.hashText(shard))
+
+def asciiAnagramHashes(text):
+    '''Return a list of the anagram hashes of the newline-separated ASCII
+    words in text, the same as Lexicon.anagramHash would return'''
+    text = text.encode('ascii').translate(ASCII_LOWER, ASCII_NONWORD)
+    return [''.join(sorted(word)) for word in text.decode('ascii').split('\n')]
+
+### Parallel regex searches ###
+
+searchLexicon = None  # the Lexicon inherited by each forked worker process
+
+def initSearchLexicon(lexicon):
+    '''Make lexicon, inherited from the parent at the fork, the one
+    searched in a worker process'''
+    global searchLexicon
+    searchLexicon = lexicon
+
+def searchShard(shard):
+    '''Return the positions in searchLexicon.words, between start and end,
+    of the words matched by a compiled pattern'''
+    pattern, start, end = shard
+    search = pattern.search
+    return [i for i, word in
+            enumerate(searchLexicon.words[start:end], start) if search(word)]
 
 if __name__ == '__main__':
     print('This module is intended to be imported rather than run standalone')
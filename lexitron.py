@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 # lexitron.py jcj 2019-02-20, 2019-05-29, 2019-07-06, 2020-02-11, 2020-05-25,
-# 2021-03-26
+# 2021-03-26, 2026-10-18
 
 '''
 Exercise the functionality of the Lexicon class implemented in lexicon.py
@@ -29,16 +29,14 @@ __ = pgettext
 # Remaining standard-library imports
 import sys
 import getopt
+import importlib
 import configparser
 
 # Private imports
 from my.error import *          # PROGNAME, STATUS and error
 from my.textutils import *      # fmt, prefixOf and getBoolean
 
-# Project imports
-from lexCon import conMain      # dumb-console user interface
-from lexTerm import termMain    # smart-terminal user interface
-from lexGui import guiMain      # graphical user interface
+# Project imports (the user interfaces are imported by interfaceMain)
 from lexStrings import *        # constant strings ID, OPT, INTER
 from lexOut import *            # full language names
 
@@ -50,10 +48,10 @@ else:
 
 SUMMARY = _('''\
 Use an external lexicon file and/or the resources of WordNet to check for
-definitions, related words, pronunciations, homophones, anagrams, and regular
-expressions. Matches may ignore case and/or diacritics. Queries can be
-submitted on the command line or interactively via a dumb console, smart
-terminal, or fully graphical interface.
+definitions, related words, pronunciations, homophones, anagrams, words made
+from given letters, and regular expressions. Matches may ignore case and/or
+diacritics. Queries can be submitted on the command line or interactively via
+a dumb console, smart terminal, or fully graphical interface.
 ''')
 
 USAGE = fmt(__('Do not translate the options beginning with - or -- ',
@@ -68,6 +66,21 @@ OPTIONS:
     -l, --{OPT.LANGUAGE} LANG   use language LANG for WordNet lookups,
                           default: English
     -f, --{OPT.LEXICON} LEX     use lexicon file LEX
+    -k, --{OPT.CACHE} DIR       keep snapshots of lexicon indexes in DIR
+                          (empty to disable), default: {ENV.CACHE_DIR}
+    -m, --{OPT.COMPACT} BOOLEAN keep the indexes in a compact form, using much
+                          less memory but answering a little more slowly,
+                          default: no
+    -j, --{OPT.JOBS} N          use N processes to build the indexes of a large
+                          lexicon and to search it, default: 1
+    -u, --{OPT.WARMUP} BOOLEAN  load WordNet in the background at startup,
+                          default: yes
+    -n, --{OPT.WORDNET} STORE   answer WordNet queries from STORE, if compiled
+                          by lexWordNet.py, rather than from NLTK,
+                          default: {ENV.WORDNET_STORE}
+    -t, --{OPT.TIMEOUT} SECS    give up on searches by several processes which
+                          take over SECS seconds (0 for no limit), default: 0,
+                          or on HTTP queries, default: 10
     -i, --{OPT.INTERFACE} {INTER.CONSOLE}|{INTER.TERMINAL}|{INTER.GRAPHIC} 
                           use the specified kind of user interface,
                           default: {INTER.CONSOLE}
@@ -75,12 +88,45 @@ OPTIONS:
                           of GUI output
     -x, --{OPT.EXEC} COMMAND    execute console-style command COMMAND
                           (may be used multiple times), then exit
+    --{OPT.SERVE}               load the lexicon once and answer commands sent
+                          by other runs of {PROGNAME} with -S
+    -S, --{OPT.SOCKET} PATH     with --{OPT.SERVE}, listen on Unix socket PATH,
+                          default: {ENV.SOCKET_FILE};
+                          otherwise send the -x commands to the server
+                          listening on PATH
+    -H, --{OPT.HTTP} [HOST:]PORT
+                          load the lexicon once and answer JSON queries
+                          over HTTP on PORT of HOST, default: localhost
+    -w, --{OPT.WORKERS} N       with --{OPT.HTTP}, answer queries in N
+                          processes sharing one copy of the lexicon,
+                          default: 1
+    -r, --{OPT.RELOAD} SECS     with --{OPT.SERVE} or --{OPT.HTTP}, check the
+                          lexicon file every SECS seconds and reload it in
+                          the background when it changes (0 never),
+                          default: 2
 
 {ID.HELP_PLAIN}'''))
 
 LANGUAGES = languageNames()
 INTERFACES = [INTER.CONSOLE, INTER.TERMINAL, INTER.GRAPHIC]
 
+def getSeconds(val):
+    '''Return a time limit in seconds (0 for none) from a string,
+    or None if it is not a valid limit'''
+    try:
+        seconds = float(val)
+    except ValueError:
+        return None
+    return seconds if seconds >= 0 else None
+
+def getAddress(val):
+    '''Return (host, port) from a string [HOST:]PORT, or None if it is not
+    a valid address'''
+    host, _sep, port = val.rpartition(':')
+    if not port.isdigit() or not 0 < int(port) < 1 << 16:
+        return None
+    return host.strip('[]') or 'localhost', int(port)
+
 def getConfigOptions(options):
     '''Try to get default values from an INI-style  configuration file.
     Failure to read an existing configuration file raises an error,
@@ -94,7 +140,7 @@ def getConfigOptions(options):
             error(STATUS.FAIL, str(err))
         for key, val in config.items('DEFAULT'):
             # booleans
-            if key in (OPT.ICASE, OPT.IDIAC):
+            if key in (OPT.ICASE, OPT.IDIAC, OPT.WARMUP, OPT.COMPACT):
                 boolean = getBoolean(val)
                 if boolean is not None:
                     options[key] = boolean
@@ -102,6 +148,20 @@ def getConfigOptions(options):
             elif key in (OPT.LEXICON, OPT.STYLE):
                 if os.path.exists(val):
                     options[key] = val
+            # directories (created when first needed)
+            elif key == OPT.CACHE:
+                options[key] = os.path.expanduser(val)
+            # files which need not exist
+            elif key == OPT.WORDNET:
+                options[key] = os.path.expanduser(val)
+            # counts
+            elif key in (OPT.JOBS, OPT.WORKERS):
+                if val.isdigit() and int(val) > 0:
+                    options[key] = int(val)
+            elif key in (OPT.TIMEOUT, OPT.RELOAD):
+                seconds = getSeconds(val)
+                if seconds is not None:
+                    options[key] = seconds
             # enumerated values
             elif key == OPT.LANGUAGE:
                 candidates = prefixOf(LANGUAGES, val)
@@ -115,27 +175,50 @@ def getConfigOptions(options):
             else:
                 pass
 
+# Interface option value -> module and handler. Only the chosen interface
+# is imported: the terminal and graphical ones are slow to import and may
+# not even be installed
+INTERFACE_MAINS = { INTER.CONSOLE: ('lexCon', 'conMain'),
+                    INTER.TERMINAL: ('lexTerm', 'termMain'),
+                    INTER.GRAPHIC: ('lexGui', 'guiMain') }
+
+def interfaceMain(interface):
+    '''Return the main function of the interface, importing it now'''
+    moduleName, functionName = INTERFACE_MAINS[interface]
+    return getattr(importlib.import_module(moduleName), functionName)
+
 def main():
     '''Perform option and argument processing'''
-    # Interface option value -> handler
-    interfaces = { INTER.CONSOLE: conMain,
-                   INTER.TERMINAL: termMain,
-                   INTER.GRAPHIC: guiMain }
     # Options: ultimate defaults
     options = { OPT.ICASE: False, OPT.IDIAC: False,
                 OPT.INTERFACE: INTER.CONSOLE,
                 OPT.LANGUAGE: languageCode(__('Name of language', 'English')),
                 OPT.LEXICON: LEXICON_FILENAME,
                 OPT.STYLE: '',
-                OPT.EXEC: [] }
+                OPT.EXEC: [],
+                OPT.CACHE: ENV.CACHE_DIR,
+                OPT.JOBS: 1,
+                OPT.TIMEOUT: 0,
+                OPT.WORDNET: ENV.WORDNET_STORE,
+                OPT.WARMUP: True,
+                OPT.SERVE: False,
+                OPT.SOCKET: '',
+                OPT.HTTP: None,
+                OPT.WORKERS: 1,
+                OPT.RELOAD: 2,
+                OPT.COMPACT: False }
     # Options: defaults in a configuration file
     getConfigOptions(options)
     # Options: values on command line
     try:
-        opts, args = getopt.getopt(sys.argv[1:], 'c:d:i:l:hf:s:Vx:',
+        opts, args = getopt.getopt(sys.argv[1:],
+            'c:d:i:j:l:hf:H:k:m:n:r:s:S:t:u:Vw:x:',
             (OPT.ICASE + '=', OPT.IDIAC + '=', OPT.INTERFACE + '=',
              OPT.LANGUAGE + '=', 'help', OPT.LEXICON + '=', OPT.STYLE + '=',
-             'version', OPT.EXEC + '='))
+             'version', OPT.EXEC + '=', OPT.CACHE + '=', OPT.JOBS + '=',
+             OPT.TIMEOUT + '=', OPT.WORDNET + '=', OPT.WARMUP + '=',
+             OPT.SERVE, OPT.SOCKET + '=', OPT.HTTP + '=',
+             OPT.WORKERS + '=', OPT.RELOAD + '=', OPT.COMPACT + '='))
     except getopt.GetoptError:
         error(STATUS.BADUSE, USAGE)
     if args:
@@ -160,6 +243,18 @@ def main():
                 options[OPT.IDIAC] = boolean
             else:
                 error(STATUS.BADUSE, USAGE)
+        elif o in ('-u', '--' + OPT.WARMUP):
+            boolean = getBoolean(a)
+            if boolean is not None:
+                options[OPT.WARMUP] = boolean
+            else:
+                error(STATUS.BADUSE, USAGE)
+        elif o in ('-m', '--' + OPT.COMPACT):
+            boolean = getBoolean(a)
+            if boolean is not None:
+                options[OPT.COMPACT] = boolean
+            else:
+                error(STATUS.BADUSE, USAGE)
         elif o in ('-i', '--' + OPT.INTERFACE):
             # expand possible interface abbreviation
             candidates = prefixOf(INTERFACES, a)
@@ -183,6 +278,32 @@ def main():
             options[OPT.LANGUAGE] = languageCode(candidates[0])
         elif o in ('-f', '--' + OPT.LEXICON):
             options[OPT.LEXICON] = a
+        elif o in ('-k', '--' + OPT.CACHE):
+            options[OPT.CACHE] = a
+        elif o in ('-j', '--' + OPT.JOBS):
+            if a.isdigit() and int(a) > 0:
+                options[OPT.JOBS] = int(a)
+            else:
+                error(STATUS.BADUSE, USAGE)
+        elif o in ('-w', '--' + OPT.WORKERS):
+            if a.isdigit() and int(a) > 0:
+                options[OPT.WORKERS] = int(a)
+            else:
+                error(STATUS.BADUSE, USAGE)
+        elif o in ('-n', '--' + OPT.WORDNET):
+            options[OPT.WORDNET] = a
+        elif o in ('-t', '--' + OPT.TIMEOUT):
+            seconds = getSeconds(a)
+            if seconds is not None:
+                options[OPT.TIMEOUT] = seconds
+            else:
+                error(STATUS.BADUSE, USAGE)
+        elif o in ('-r', '--' + OPT.RELOAD):
+            seconds = getSeconds(a)
+            if seconds is not None:
+                options[OPT.RELOAD] = seconds
+            else:
+                error(STATUS.BADUSE, USAGE)
         elif o in ('-s', '--' + OPT.STYLE):
             if a:
                 if os.path.exists(a):
@@ -193,9 +314,24 @@ def main():
         elif o in ('-x', '--' + OPT.EXEC):
             options[OPT.EXEC].append(a)
             options[OPT.INTERFACE] = INTER.CONSOLE
+        elif o == '--' + OPT.SERVE:
+            options[OPT.SERVE] = True
+        elif o in ('-S', '--' + OPT.SOCKET):
+            options[OPT.SOCKET] = os.path.expanduser(a)
+        elif o in ('-H', '--' + OPT.HTTP):
+            options[OPT.HTTP] = getAddress(a)
+            if options[OPT.HTTP] is None:
+                error(STATUS.BADUSE, USAGE)
         else:
             assert False, 'Internal error: Unhandled option'
-    interfaces[options[OPT.INTERFACE]](options)
+    if options[OPT.HTTP]:
+        importlib.import_module('lexHttp').httpMain(options)
+    elif options[OPT.SERVE]:
+        options[OPT.SOCKET] = options[OPT.SOCKET] or ENV.SOCKET_FILE
+        importlib.import_module('lexServe').serveMain(options)
+    elif options[OPT.SOCKET] and options[OPT.EXEC]:
+        importlib.import_module('lexServe').clientMain(options)
+    interfaceMain(options[OPT.INTERFACE])(options)
     sys.exit(STATUS.OK)
 
 if __name__ == '__main__':